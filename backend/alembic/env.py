@@ -45,10 +45,13 @@ def import_all_models(package_name: str):
 import_all_models("app.modules")
 
 # Explicitly import all models to ensure they're registered
-from app.modules.habit.models import Habit, HabitEntry
+from app.modules.user.models import User
+from app.modules.habit.models import Habit, HabitEntry, HabitMetric
 from app.modules.journal.models import DailyJournal
 from app.modules.plan.models import Plan
-from app.modules.chat.models import Message
+from app.modules.chat.models import Message, MessageArchive, MessageDigest
+from app.modules.review.models import DailySnapshot
+from app.core.scheduler import JobLease
 
 # Target metadata for autogeneration
 target_metadata = Base.metadata
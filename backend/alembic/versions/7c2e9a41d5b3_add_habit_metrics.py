@@ -0,0 +1,85 @@
+"""Add habit_metrics table
+
+Revision ID: 7c2e9a41d5b3
+Revises: 18991ee2bc4d
+Create Date: 2026-10-19 10:12:41.218904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9a41d5b3'
+down_revision: Union[str, Sequence[str], None] = '18991ee2bc4d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def _extract_metrics(value, prefix=""):
+    # Frozen copy of app.modules.habit.service.extract_metrics
+    metrics = {}
+    if not isinstance(value, dict):
+        return metrics
+    for key, item in value.items():
+        name = f"{prefix}{key}"
+        if isinstance(item, bool):
+            metrics[name] = 1.0 if item else 0.0
+        elif isinstance(item, (int, float)):
+            metrics[name] = float(item)
+        elif isinstance(item, dict):
+            metrics.update(_extract_metrics(item, f"{name}."))
+    return metrics
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    habit_metrics = op.create_table('habit_metrics',
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('numeric_value', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['entry_id'], ['habit_entries.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['habit_id'], ['habits.id'], ),
+    sa.PrimaryKeyConstraint('entry_id', 'key')
+    )
+    op.create_index('ix_habit_metrics_habit_key_date', 'habit_metrics', ['habit_id', 'key', 'date'], unique=False)
+    op.create_index('ix_habit_metrics_habit_key_value', 'habit_metrics', ['habit_id', 'key', 'numeric_value'], unique=False)
+
+    # Backfill from existing entries
+    habit_entries = sa.table('habit_entries',
+        sa.column('id', sa.Integer()),
+        sa.column('habit_id', sa.Integer()),
+        sa.column('date', sa.Date()),
+        sa.column('value', sa.JSON()),
+    )
+    bind = op.get_bind()
+    rows = []
+    entries = bind.execute(sa.select(habit_entries).order_by(habit_entries.c.id)).all()
+    for entry in entries:
+        for key, number in _extract_metrics(entry.value).items():
+            rows.append({
+                'entry_id': entry.id,
+                'key': key,
+                'habit_id': entry.habit_id,
+                'date': entry.date,
+                'numeric_value': number,
+            })
+            if len(rows) >= BATCH_SIZE:
+                op.bulk_insert(habit_metrics, rows)
+                rows = []
+    if rows:
+        op.bulk_insert(habit_metrics, rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_habit_metrics_habit_key_value', table_name='habit_metrics')
+    op.drop_index('ix_habit_metrics_habit_key_date', table_name='habit_metrics')
+    op.drop_table('habit_metrics')
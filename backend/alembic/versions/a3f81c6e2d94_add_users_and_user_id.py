@@ -0,0 +1,100 @@
+"""Add users and a user_id to every table
+
+Revision ID: a3f81c6e2d94
+Revises: 7c2e9a41d5b3
+Create Date: 2026-10-19 14:03:55.671320
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f81c6e2d94'
+down_revision: Union[str, Sequence[str], None] = '7c2e9a41d5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Existing rows all belong to the single user the app served so far.
+DEFAULT_USER_ID = 1
+TABLES = ('messages', 'habits', 'habit_entries', 'habit_metrics', 'daily_journal', 'plans')
+
+
+def alter_unique(table: str):
+    # SQLite reflects the v1 unique constraints without names; give them Postgres' names so they can be dropped.
+    if op.get_bind().dialect.name == 'sqlite':
+        return op.batch_alter_table(table, naming_convention={'uq': '%(table_name)s_%(column_0_N_name)s_key'})
+    return op.batch_alter_table(table)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(sa.text(
+        f"INSERT INTO users (id, created_at) VALUES ({DEFAULT_USER_ID}, CURRENT_TIMESTAMP)"
+    ))
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.text("SELECT setval('users_id_seq', (SELECT MAX(id) FROM users))"))
+
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=False, server_default=str(DEFAULT_USER_ID)))
+            batch_op.create_foreign_key(f'{table}_user_id_fkey', 'users', ['user_id'], ['id'])
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('user_id', server_default=None)
+
+    # Per-user uniqueness and indexes leading with user_id
+    with alter_unique('habits') as batch_op:
+        batch_op.drop_constraint('habits_name_key', type_='unique')
+        batch_op.create_unique_constraint('habits_user_id_name_key', ['user_id', 'name'])
+    with alter_unique('daily_journal') as batch_op:
+        batch_op.drop_constraint('daily_journal_date_key', type_='unique')
+        batch_op.create_unique_constraint('daily_journal_user_id_date_key', ['user_id', 'date'])
+    with alter_unique('plans') as batch_op:
+        batch_op.drop_constraint('plans_date_key', type_='unique')
+        batch_op.create_unique_constraint('plans_user_id_date_key', ['user_id', 'date'])
+
+    op.create_index('ix_messages_user_created_at', 'messages', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_habit_entries_user_date', 'habit_entries', ['user_id', 'date'], unique=False)
+    op.drop_index('ix_habit_metrics_habit_key_value', table_name='habit_metrics')
+    op.drop_index('ix_habit_metrics_habit_key_date', table_name='habit_metrics')
+    op.create_index('ix_habit_metrics_user_habit_key_date', 'habit_metrics', ['user_id', 'habit_id', 'key', 'date'], unique=False)
+    op.create_index('ix_habit_metrics_user_habit_key_value', 'habit_metrics', ['user_id', 'habit_id', 'key', 'numeric_value'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_habit_metrics_user_habit_key_value', table_name='habit_metrics')
+    op.drop_index('ix_habit_metrics_user_habit_key_date', table_name='habit_metrics')
+    op.create_index('ix_habit_metrics_habit_key_date', 'habit_metrics', ['habit_id', 'key', 'date'], unique=False)
+    op.create_index('ix_habit_metrics_habit_key_value', 'habit_metrics', ['habit_id', 'key', 'numeric_value'], unique=False)
+    op.drop_index('ix_habit_entries_user_date', table_name='habit_entries')
+    op.drop_index('ix_messages_user_created_at', table_name='messages')
+
+    # Only the default user's rows fit the single-user constraints
+    for table in reversed(TABLES):
+        op.execute(sa.text(f"DELETE FROM {table} WHERE user_id <> {DEFAULT_USER_ID}"))
+
+    with alter_unique('plans') as batch_op:
+        batch_op.drop_constraint('plans_user_id_date_key', type_='unique')
+        batch_op.create_unique_constraint('plans_date_key', ['date'])
+    with alter_unique('daily_journal') as batch_op:
+        batch_op.drop_constraint('daily_journal_user_id_date_key', type_='unique')
+        batch_op.create_unique_constraint('daily_journal_date_key', ['date'])
+    with alter_unique('habits') as batch_op:
+        batch_op.drop_constraint('habits_user_id_name_key', type_='unique')
+        batch_op.create_unique_constraint('habits_name_key', ['name'])
+
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f'{table}_user_id_fkey', type_='foreignkey')
+            batch_op.drop_column('user_id')
+    op.drop_table('users')
@@ -0,0 +1,163 @@
+import hashlib
+import time
+from collections import OrderedDict
+from email.utils import formatdate
+from typing import Awaitable, Callable, Iterable, Optional, Tuple
+
+from fastapi import Request, Response, status
+
+from app.core.config import settings
+from app.core.users import current_user_id
+
+# Resource names shared by the services (which bump them on write) and the
+# read endpoints (which derive their ETags from them).
+MESSAGES = "messages"
+HABITS = "habits"
+JOURNAL = "journal"
+PLANS = "plans"
+
+
+class VersionTracker:
+    """Change feed sequence of each user and resource's last write, hashed into ETags by read endpoints."""
+
+    def __init__(self, maxsize: int = 10000):
+        # Set while the versions see every worker's writes (a live shared change feed)
+        self.shared = False
+        self._started_at = time.time()
+        self.maxsize = maxsize
+        # LRU by last write. An evicted pair reads as the highest version and
+        # time evicted so far, so versions never go back and ETags never repeat.
+        self._versions: "OrderedDict[Tuple[int, str], Tuple[int, float]]" = OrderedDict()
+        self._last_write: "OrderedDict[int, float]" = OrderedDict()
+        self._floor: Tuple[int, float] = (0, self._started_at)
+
+    @staticmethod
+    def _key(resource: str, user_id: Optional[int]) -> Tuple[int, str]:
+        return (current_user_id() if user_id is None else user_id, resource)
+
+    def _get(self, key: Tuple[int, str]) -> Tuple[int, float]:
+        return self._versions.get(key, self._floor)
+
+    def bump(self, resource: str, user_id: Optional[int] = None, seq: int = 0) -> int:
+        key = self._key(resource, user_id)
+        now = time.time()
+        # The feed's seq when it moves forward, so every worker that saw the
+        # write agrees on the version; always higher than before either way.
+        current = self._get(key)[0]
+        version = seq if seq > current else current + 1
+        self._versions[key] = (version, now)
+        self._versions.move_to_end(key)
+        while len(self._versions) > self.maxsize:
+            evicted = self._versions.popitem(last=False)[1]
+            self._floor = (max(self._floor[0], evicted[0]), max(self._floor[1], evicted[1]))
+        self._last_write[key[0]] = now
+        self._last_write.move_to_end(key[0])
+        while len(self._last_write) > self.maxsize:
+            # Least recent writer: long past any read-after-write window
+            self._last_write.popitem(last=False)
+        return version
+
+    def last_write(self, user_id: Optional[int] = None) -> float:
+        """When the user last wrote anything, or 0."""
+        return self._last_write.get(current_user_id() if user_id is None else user_id, 0.0)
+
+    def version(self, resource: str, user_id: Optional[int] = None) -> int:
+        return self._get(self._key(resource, user_id))[0]
+
+    def known(self, resources: Iterable[str], user_id: Optional[int] = None) -> bool:
+        """Whether this worker saw the last write to each resource (else its version is a floor)."""
+        return all(self._key(r, user_id) in self._versions for r in resources)
+
+    def forget(self, floor: int) -> None:
+        """Drop every tracked version after missed writes; all read as ``floor`` (the feed's seq) until written."""
+        self._floor = (max(self._floor[0], floor), time.time())
+        self._versions.clear()
+
+    def last_modified(self, resources: Iterable[str], user_id: Optional[int] = None) -> float:
+        return max((self._get(self._key(r, user_id))[1] for r in resources), default=self._started_at)
+
+    def etag(self, resources: Iterable[str], *parts, user_id: Optional[int] = None) -> str:
+        user = current_user_id() if user_id is None else user_id
+        key = "|".join(
+            [f"user:{user}"]
+            + [f"{r}:{self.version(r, user)}" for r in resources]
+            + [str(p) for p in parts]
+        )
+        return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+class ResponseCache:
+    """Small LRU of rendered response bodies keyed by ETag."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+
+    def get(self, etag: str) -> Optional[Tuple[bytes, str]]:
+        entry = self._entries.get(etag)
+        if entry is not None:
+            self._entries.move_to_end(etag)
+        return entry
+
+    def set(self, etag: str, body: bytes, media_type: str) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[etag] = (body, media_type)
+        self._entries.move_to_end(etag)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+versions = VersionTracker(settings.VERSION_TRACKER_SIZE)
+response_cache = ResponseCache(settings.RESPONSE_CACHE_SIZE)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def stored_etag(token: str, *parts) -> str:
+    """ETag from a version read from the database, valid in every worker."""
+    key = "|".join([f"user:{current_user_id()}", token] + [str(p) for p in parts])
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+async def conditional_response(
+    request: Request,
+    resources: Iterable[str],
+    build: Callable[[], Awaitable[Response]],
+    *key_parts,
+    stored_version: Optional[Callable[[], Awaitable[str]]] = None,
+) -> Response:
+    """Serve a read endpoint with ETag / Last-Modified validation; ``build`` is only awaited on a miss."""
+    resources = list(resources)
+    headers = {"Cache-Control": "no-cache"}
+    # Versions are feed seqs, equal in every worker, once this worker has seen the
+    # last write through a live shared feed; otherwise ask the database, or build.
+    if versions.shared and versions.known(resources):
+        etag = versions.etag(resources, request.url.path, *key_parts)
+        headers["Last-Modified"] = formatdate(versions.last_modified(resources), usegmt=True)
+    elif stored_version is not None:
+        etag = stored_etag(await stored_version(), request.url.path, *key_parts)
+    else:
+        return await build()
+    headers["ETag"] = etag
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cached = response_cache.get(etag)
+    if cached is not None:
+        body, media_type = cached
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    response = await build()
+    if response.status_code == status.HTTP_200_OK:
+        response_cache.set(etag, response.body, response.media_type)
+        response.headers.update(headers)
+    return response
@@ -0,0 +1,116 @@
+import gzip
+import logging
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from app.core.config import settings
+from app.core.log import request_id_var
+from app.core.users import current_user_id
+
+logger = logging.getLogger(__name__)
+
+# Agent steps recorded for the request being captured; ``None`` when not capturing.
+transcript_var: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("capture_transcript", default=None)
+
+_STOP = object()
+
+
+class TrafficRecorder:
+    """Appends one JSON line per captured request to ``path`` from a background thread (gzipped for ``.gz``)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if not self.path or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+        logger.info("Capturing API traffic to %s", self.path)
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        if self._thread is not None:
+            self._queue.put(entry)
+
+    def _run(self) -> None:
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "ab") as f:
+            while True:
+                entry = self._queue.get()
+                if entry is _STOP:
+                    break
+                try:
+                    f.write(orjson.dumps(entry, default=str) + b"\n")
+                    f.flush()
+                except Exception:
+                    logger.exception("Error writing captured request")
+
+
+class CaptureMiddleware:
+    """Record API requests for later replay when ``CAPTURE_PATH`` is set; install inside ``RequestIdMiddleware``."""
+
+    def __init__(self, app, recorder: TrafficRecorder, prefix: str = settings.API_V1_STR):
+        self.app = app
+        self.recorder = recorder
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.recorder.active or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+        status = 0
+
+        async def receive_and_keep():
+            message = await receive()
+            if message["type"] == "http.request" and len(body) < settings.CAPTURE_MAX_BODY:
+                body.extend(message.get("body", b"")[: settings.CAPTURE_MAX_BODY - len(body)])
+            return message
+
+        async def send_and_watch(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        transcript: List[Dict[str, Any]] = []
+        token = transcript_var.set(transcript)
+        at = time.time()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_and_keep, send_and_watch)
+        finally:
+            transcript_var.reset(token)
+            self.recorder.record({
+                "at": at,
+                "request_id": request_id_var.get(),
+                "user_id": current_user_id(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope["query_string"].decode("latin-1"),
+                "body": body.decode("utf-8", "replace") if body else None,
+                "status": status,
+                "duration": time.perf_counter() - started,
+                "llm": transcript,
+            })
+
+
+recorder = TrafficRecorder(settings.CAPTURE_PATH)
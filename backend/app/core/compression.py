@@ -0,0 +1,123 @@
+import gzip
+from typing import Iterable, List, Optional, Set
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.cache import ResponseCache
+from app.core.config import settings
+from app.core.metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+# Streamed or already-compressed media types
+SKIP_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/gzip", "application/zip")
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    """Encodings an ``Accept-Encoding`` header allows (q > 0)."""
+    accepted = set()
+    for part in header.split(","):
+        token, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if token.strip() and quality > 0:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+def compress(body: bytes, encoding: str, gzip_level: int, brotli_quality: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime=0 so equal bodies compress to equal bytes
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """Compress bodies sent in one piece with the first of ``encodings`` the client accepts."""
+
+    def __init__(
+        self,
+        app,
+        encodings: Iterable[str] = settings.COMPRESSION_ENCODINGS.split(","),
+        minimum_size: int = settings.COMPRESSION_MIN_SIZE,
+        gzip_level: int = settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = settings.COMPRESSION_BROTLI_QUALITY,
+    ):
+        self.app = app
+        self.encodings: List[str] = [
+            e for e in (e.strip().lower() for e in encodings)
+            if e == "gzip" or (e == "br" and brotli is not None)
+        ]
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = ResponseCache(settings.RESPONSE_CACHE_SIZE)
+
+    def _choose(self, scope) -> Optional[str]:
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding in self.encodings:
+            if encoding in accepted or "*" in accepted:
+                return encoding
+        return None
+
+    async def __call__(self, scope, receive, send):
+        encoding = self._choose(scope) if scope["type"] == "http" and self.encodings else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+
+            response_start, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(scope=response_start)
+            if "content-encoding" in headers or headers.get("content-type", "").startswith(SKIP_TYPES):
+                await send(response_start)
+                await send(message)
+                return
+
+            # Small bodies and 304s carry the same weak ETag a compressed 200 would
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                etag = headers["ETag"] = f"W/{etag}"
+            headers.add_vary_header("Accept-Encoding")
+            if message.get("more_body") or len(body) < self.minimum_size:
+                await send(response_start)
+                await send(message)
+                return
+
+            key = f"{encoding}:{etag}" if etag else None
+            cached = self.cache.get(key) if key else None
+            if cached is not None:
+                compressed = cached[0]
+            else:
+                compressed = compress(body, encoding, self.gzip_level, self.brotli_quality)
+                if key:
+                    self.cache.set(key, compressed, encoding)
+            metrics.incr("compression.bytes_in", len(body))
+            metrics.incr("compression.bytes_out", len(compressed))
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            await send(response_start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -9,9 +9,107 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    SQL_ECHO: bool = False
+    # Read-only sessions: a replica DSN, or empty to read from the primary
+    # (a second WAL-mode connection on SQLite, autocommit on Postgres).
+    # After a user writes, their reads stay on the primary this long to
+    # cover replica lag.
+    DATABASE_READ_URL: str = ""
+    DATABASE_READ_STICKY_SECONDS: float = 5.0
+    # Round-trip budgets on service functions: "off", "warn" or "raise".
+    # The test suite checks every budget; at runtime the check is opt-in.
+    QUERY_BUDGET_MODE: str = "off"
+
+    # Users: every request acts as the default user unless TRUST_USER_HEADER
+    # is on, which is only safe behind a proxy or auth layer that sets
+    # X-User-Id itself. Each user may hold this many DB-backed requests at once.
+    DEFAULT_USER_ID: int = 1
+    TRUST_USER_HEADER: bool = False
+    USER_MAX_CONCURRENT_REQUESTS: int = 4
+
+    # Message retention: messages older than this many days move, in batches,
+    # into compressed per-day archives with a digest (0 disables archiving).
+    # The agent's context carries the digests of this many earlier days.
+    MESSAGE_ARCHIVE_AFTER_DAYS: int = 90
+    MESSAGE_ARCHIVE_BATCH_SIZE: int = 500
+    MESSAGE_ARCHIVE_INTERVAL_SECONDS: float = 3600.0
+    MESSAGE_DIGEST_MAX_CHARS: int = 2000
+    CONTEXT_DIGEST_DAYS: int = 7
+
+    # Scheduled jobs (local time, "HH:MM"): daily review snapshots and
+    # warming the LLM runtime. Jobs that must run once across workers hold a
+    # lease in job_leases, taken over when it expires.
+    SCHEDULER_ENABLED: bool = True
+    DAILY_REVIEW_AT: str = "04:00"
+    JOB_LEASE_SECONDS: float = 600.0
+    STREAK_LOOKBACK_DAYS: int = 90
+
+    # Logging: level, "json" or "text" output, and sampling of agent traces
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    AGENT_TRACE_SAMPLE_RATE: float = 0.05
+    AGENT_TRACE_MAX_CHARS: int = 2000
+
+    # Traffic capture (opt-in): API requests and agent transcripts as JSONL,
+    # gzip-compressed when the path ends in .gz. Re-drive with app.devtools.replay.
+    CAPTURE_PATH: str = ""
+    CAPTURE_MAX_BODY: int = 65536
+    # Serve recorded LLM responses from a capture instead of calling Gemini
+    REPLAY_CAPTURE_PATH: str = ""
+    REPLAY_SPEED: float = 1.0
+
+    # Admin-only endpoints (profiling); disabled while the token is empty
+    ADMIN_TOKEN: str = ""
+    # Where profiles (.prof, .folded) are written when profiling is switched on
+    PROFILE_DIR: str = "profiles"
+
+    # HTTP caching: rendered read responses kept per ETag, and the most
+    # recently written (user, resource) pairs whose versions are tracked
+    RESPONSE_CACHE_SIZE: int = 256
+    VERSION_TRACKER_SIZE: int = 10000
+    # Response compression in order of preference ("br" needs the brotli
+    # package), for bodies of at least COMPRESSION_MIN_SIZE bytes. Empty
+    # encodings turn it off.
+    COMPRESSION_ENCODINGS: str = "br,gzip"
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    # Longest ``truncate`` the message history accepts
+    MESSAGE_TRUNCATE_MAX: int = 10000
+
+    # Change feed: "memory" (single worker) or "postgres" (LISTEN/NOTIFY),
+    # buffering the last CHANGE_FEED_HISTORY events of up to CHANGE_FEED_USERS users
+    CHANGE_FEED_BACKEND: str = "memory"
+    CHANGE_FEED_HISTORY: int = 1000
+    CHANGE_FEED_USERS: int = 1000
+
+    # Deterministic handling of structured logging messages before the agent
+    FASTPATH_ENABLED: bool = True
+    FASTPATH_MIN_CONFIDENCE: float = 1.0
 
     # Gemini API
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    # Model routing: trivial turns go to the fast model, the rest to pro.
+    # GEMINI_ROUTE_OVERRIDE ("fast" or "pro") pins every turn to one tier.
+    GEMINI_PRO_MODEL: str = "gemini-2.5-pro"
+    GEMINI_FAST_MODEL: str = "gemini-2.5-flash"
+    GEMINI_ROUTE_OVERRIDE: str = ""
+    GEMINI_FAST_MAX_CHARS: int = 160
+
+    # Knowledge retrieval: top-k chunks per turn under a token budget
+    KNOWLEDGE_TOP_K: int = 6
+    KNOWLEDGE_TOKEN_BUDGET: int = 1500
+    KNOWLEDGE_CHUNK_CHARS: int = 1200
+    # Seconds between checks of the knowledge files and system prompt for edits
+    KNOWLEDGE_REFRESH_SECONDS: float = 30.0
+
+    # Agent loop bounds: whole-turn budget, per-tool budget, tool-calling rounds
+    AGENT_TURN_TIMEOUT: float = 60.0
+    AGENT_TOOL_TIMEOUT: float = 15.0
+    AGENT_MAX_ITERATIONS: int = 8
+    # Explicit provider-side caching of the system prompt and tool schemas
+    GEMINI_CONTEXT_CACHE: bool = False
+    GEMINI_CONTEXT_CACHE_TTL: int = 3600
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
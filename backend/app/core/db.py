@@ -1,21 +1,25 @@
+import time
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
 from sqlmodel import SQLModel
+from app.core.cache import versions
 from app.core.config import settings
 
 # Synchronous engine used by Alembic for migrations
 sync_engine = create_engine(
     str(settings.DATABASE_URL).replace("+asyncpg", "").replace("+aiosqlite", ""),
-    echo=True,
+    echo=settings.SQL_ECHO,
     future=True,
 )
 
 # Conditional asynchronous engine for the application
 if "+asyncpg" in settings.DATABASE_URL or "+aiosqlite" in settings.DATABASE_URL:
     async_engine = create_async_engine(
-        str(settings.DATABASE_URL), echo=True, future=True
+        str(settings.DATABASE_URL), echo=settings.SQL_ECHO, future=True
     )
     async_session_factory = sessionmaker(
         async_engine, class_=AsyncSession, expire_on_commit=False
@@ -25,6 +29,38 @@ else:
     async_session_factory = None
 
 
+def _sqlite_pragmas(*pragmas: str):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+    return on_connect
+
+
+# Read-only engine: a replica when DATABASE_READ_URL is set. Otherwise reads
+# hit the primary through their own connections: on SQLite a second
+# query-only connection, which WAL mode lets run alongside the writer; on
+# Postgres the same pool in autocommit, skipping BEGIN/COMMIT round trips.
+replica_engine = None
+if async_engine is None:
+    read_engine = None
+elif settings.DATABASE_READ_URL:
+    replica_engine = read_engine = create_async_engine(
+        settings.DATABASE_READ_URL, echo=settings.SQL_ECHO, future=True
+    )
+elif async_engine.dialect.name == "sqlite":
+    event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas("journal_mode=WAL"))
+    read_engine = create_async_engine(
+        str(settings.DATABASE_URL), echo=settings.SQL_ECHO, future=True
+    )
+    event.listen(read_engine.sync_engine, "connect", _sqlite_pragmas("journal_mode=WAL", "query_only=ON"))
+else:
+    read_engine = async_engine
+if read_engine is not None and read_engine.dialect.name == "postgresql":
+    read_engine = read_engine.execution_options(isolation_level="AUTOCOMMIT")
+
+
 # Base class for all SQLModel models (used by Alembic)
 class Base(SQLModel):
     pass
@@ -40,6 +76,25 @@ if async_engine is not None:
 else:
     async_session = None
 
+# Read sessions never write, so they skip autoflush as well.
+if read_engine is not None:
+    async_read_session = sessionmaker(
+        read_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False
+    )
+else:
+    async_read_session = None
+
+
+def read_session() -> AsyncSession:
+    """Session for read-only work, on the primary while the current user has written recently."""
+    if async_read_session is None:
+        raise RuntimeError("Async engine not configured for the current DATABASE_URL")
+    if replica_engine is not None:
+        # Other workers' writes are only seen through a shared change feed
+        if time.time() - versions.last_write() < settings.DATABASE_READ_STICKY_SECONDS:
+            return async_session()
+    return async_read_session()
+
 
 # Dependency to get an asynchronous database session.
 # This function can be used with FastAPI's Depends to inject a session into route handlers.
@@ -48,3 +103,9 @@ async def get_session() -> AsyncSession:
         raise RuntimeError("Async engine not configured for the current DATABASE_URL")
     async with async_session() as session:
         yield session
+
+
+# Dependency for read-only route handlers.
+async def get_read_session() -> AsyncSession:
+    async with read_session() as session:
+        yield session
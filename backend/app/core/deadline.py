@@ -0,0 +1,56 @@
+import asyncio
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from app.core.metrics import metrics
+
+# Absolute ``time.monotonic()`` deadline of the current unit of work, if any.
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    """Bound everything awaited inside the block to ``seconds`` from now; nesting can only shorten it."""
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        at = min(at, current)
+    token = _deadline.set(at)
+    try:
+        yield at
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or ``None`` when unbounded."""
+    at = _deadline.get()
+    return None if at is None else max(0.0, at - time.monotonic())
+
+
+def budget(timeout: Optional[float]) -> Optional[float]:
+    """The smaller of ``timeout`` and what is left of the current deadline."""
+    left = remaining()
+    if timeout is None:
+        return left
+    return timeout if left is None else min(timeout, left)
+
+
+def bounded(timeout: Optional[float]):
+    """Cap an agent tool at ``timeout`` seconds, or the nearer turn deadline, returning an error string on expiry."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            limit = budget(timeout)
+            try:
+                return await asyncio.wait_for(func(*args, **kwargs), limit)
+            except asyncio.TimeoutError:
+                metrics.incr(f"agent.tool_timeouts.{func.__name__}")
+                return f"Error: {func.__name__} timed out after {limit:.1f}s"
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,306 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, asdict
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.cache import versions
+from app.core.config import settings
+from app.core.users import current_user_id
+
+logger = logging.getLogger(__name__)
+
+# How long an event waits for a missing earlier sequence number before the
+# feed gives up on it (a writer that took a number but never notified).
+REORDER_SECONDS = 1.0
+
+# Backoff between attempts to reconnect the shared feed's listener
+RECONNECT_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 30.0
+
+
+@dataclass
+class ChangeEvent:
+    seq: int
+    resource: str
+    action: str
+    user_id: int
+    data: Dict[str, Any] = field(default_factory=dict)
+    at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class _UserFeed:
+    """One user's most recent events and the subscribers waiting on them."""
+
+    def __init__(self, history: int, dropped_through: int):
+        self.events: Deque[ChangeEvent] = deque(maxlen=history)
+        # Highest seq of this user's that is no longer buffered
+        self.dropped_through = dropped_through
+        self.wakeup = asyncio.Event()
+        self.waiters = 0
+
+
+class ChangeHub:
+    """In-process feed of each user's committed writes, keeping their most recent ``history`` events."""
+
+    def __init__(self, history: int = 1000, max_users: int = 1000):
+        self.history = history
+        self.max_users = max_users
+        # Per user, so a write only touches its own user's buffer and subscribers.
+        # LRU by last event; feeds with subscribers waiting are never evicted.
+        self._feeds: "OrderedDict[int, _UserFeed]" = OrderedDict()
+        self._evicted_through = 0
+        self._seq = 0
+        # Events that arrived ahead of a gap, by seq, with their arrival time
+        self._pending: Dict[int, Tuple[float, ChangeEvent]] = {}
+        self._flush: Optional[asyncio.TimerHandle] = None
+        # Seqs this worker published and already counted in ``versions``
+        self._own: Set[int] = set()
+        self._backend: Optional["PostgresChangeBackend"] = None
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    async def start(self) -> None:
+        if settings.CHANGE_FEED_BACKEND == "postgres":
+            self._backend = PostgresChangeBackend(settings.DATABASE_URL, self)
+            await self._backend.start()
+
+    async def stop(self) -> None:
+        if self._backend is not None:
+            await self._backend.stop()
+            self._backend = None
+
+    async def publish(
+        self, resource: str, action: str, data: Optional[Dict[str, Any]] = None, user_id: Optional[int] = None
+    ) -> None:
+        data = data or {}
+        user_id = current_user_id() if user_id is None else user_id
+        if self._backend is None:
+            self.deliver(ChangeEvent(seq=self._seq + 1, resource=resource, action=action, user_id=user_id, data=data))
+            return
+        try:
+            seq = await self._backend.publish(resource, action, user_id, data)
+        except Exception:
+            # Numbers belong to the database sequence, so there is no local
+            # one to fall back on; other workers miss this change.
+            logger.exception("Change feed backend publish failed, change not broadcast")
+            versions.bump(resource, user_id)
+            return
+        # Bump now so this worker's ETags change before the notification
+        # makes its round trip; ``deliver`` then skips it (unless it came first).
+        if seq > self._seq and seq not in self._pending:
+            versions.bump(resource, user_id, seq)
+            self._own.add(seq)
+
+    def deliver(self, event: ChangeEvent) -> None:
+        """Add an event in sequence order and wake every waiting subscriber."""
+        if event.seq in self._own:
+            self._own.discard(event.seq)
+        else:
+            versions.bump(event.resource, event.user_id, event.seq)
+        if event.seq <= self._seq:
+            # Its gap was already given up on; subscribers have moved past it.
+            logger.warning("Dropping change %d delivered after the reorder window", event.seq)
+            return
+        self._pending[event.seq] = (time.monotonic(), event)
+        self._advance()
+
+    def _advance(self) -> None:
+        """Release pending events up to the next gap, skipping gaps older than REORDER_SECONDS."""
+        if self._flush is not None:
+            self._flush.cancel()
+            self._flush = None
+        woken: Dict[int, _UserFeed] = {}
+        while self._pending:
+            if self._seq + 1 not in self._pending:
+                oldest = min(self._pending)
+                waited = time.monotonic() - self._pending[oldest][0]
+                if waited < REORDER_SECONDS:
+                    self._flush = asyncio.get_running_loop().call_later(REORDER_SECONDS - waited, self._advance)
+                    break
+                self._seq = oldest - 1
+            self._seq += 1
+            event = self._pending.pop(self._seq)[1]
+            feed = self._feed(event.user_id)
+            if len(feed.events) == feed.events.maxlen:
+                feed.dropped_through = feed.events[0].seq
+            feed.events.append(event)
+            woken[event.user_id] = feed
+        for feed in woken.values():
+            wakeup, feed.wakeup = feed.wakeup, asyncio.Event()
+            wakeup.set()
+
+    def resync(self, seq: int) -> None:
+        """Continue from ``seq`` after events may have been missed; every subscriber behind it resets."""
+        self._pending = {s: p for s, p in self._pending.items() if s > seq}
+        if seq > self._seq:
+            self._seq = seq
+            self._evicted_through = max(self._evicted_through, seq)
+            for feed in self._feeds.values():
+                feed.dropped_through = max(feed.dropped_through, seq)
+                wakeup, feed.wakeup = feed.wakeup, asyncio.Event()
+                wakeup.set()
+        if self._pending:
+            self._advance()
+
+    def _feed(self, user_id: int) -> _UserFeed:
+        feed = self._feeds.get(user_id)
+        if feed is None:
+            # Whatever an evicted feed held is gone; subscribers from before it must reset.
+            feed = self._feeds[user_id] = _UserFeed(self.history, self._evicted_through)
+            for idle_user in list(self._feeds):
+                if len(self._feeds) <= self.max_users:
+                    break
+                idle = self._feeds[idle_user]
+                if idle.waiters == 0 and idle is not feed:
+                    if idle.events:
+                        self._evicted_through = max(self._evicted_through, idle.events[-1].seq)
+                    del self._feeds[idle_user]
+        self._feeds.move_to_end(user_id)
+        return feed
+
+    def since(
+        self, seq: int, resources: Optional[Iterable[str]] = None, user_id: Optional[int] = None
+    ) -> Tuple[List[ChangeEvent], bool]:
+        """Return the user's events after ``seq`` and whether the caller fell out of the buffer."""
+        user_id = current_user_id() if user_id is None else user_id
+        feed = self._feeds.get(user_id)
+        if feed is None:
+            return [], seq < self._evicted_through
+        wanted = set(resources) if resources else None
+        events = [e for e in feed.events if e.seq > seq and (wanted is None or e.resource in wanted)]
+        return events, seq < feed.dropped_through
+
+    async def wait(
+        self, seq: int, timeout: float, resources: Optional[Iterable[str]] = None
+    ) -> Tuple[List[ChangeEvent], bool]:
+        """Long-poll: return as soon as there is something after ``seq`` or ``timeout`` elapses."""
+        deadline = time.monotonic() + timeout
+        user_id = current_user_id()
+        feed = self._feed(user_id)
+        feed.waiters += 1
+        try:
+            while True:
+                wakeup = feed.wakeup
+                events, reset = self.since(seq, resources, user_id)
+                remaining = deadline - time.monotonic()
+                if events or reset or remaining <= 0:
+                    return events, reset
+                try:
+                    await asyncio.wait_for(wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return [], False
+        finally:
+            feed.waiters -= 1
+
+
+class PostgresChangeBackend:
+    """Shares the feed between workers through ``LISTEN/NOTIFY``, numbered by a database sequence."""
+
+    CHANNEL = "lifeos_changes"
+    SEQUENCE = "lifeos_change_seq"
+
+    def __init__(self, database_url: str, hub: ChangeHub):
+        self.dsn = database_url.replace("+asyncpg", "")
+        self.hub = hub
+        self._conn = None
+        self._lock = asyncio.Lock()
+        self._reconnect: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        await self._connect()
+
+    async def stop(self) -> None:
+        versions.shared = False
+        if self._reconnect is not None:
+            self._reconnect.cancel()
+            self._reconnect = None
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            conn.remove_termination_listener(self._on_terminated)
+            await conn.remove_listener(self.CHANNEL, self._on_notify)
+            await conn.close()
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        conn = await asyncpg.connect(self.dsn)
+        try:
+            await conn.execute(f"CREATE SEQUENCE IF NOT EXISTS {self.SEQUENCE}")
+            # Listen before reading the sequence so nothing after it is missed
+            await conn.add_listener(self.CHANNEL, self._on_notify)
+            seq = await conn.fetchval(
+                f"SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {self.SEQUENCE}"
+            )
+        except BaseException:
+            await conn.close()
+            raise
+        conn.add_termination_listener(self._on_terminated)
+        self._conn = conn
+        # Whatever happened while not listening is unknown: drop it all
+        versions.forget(seq)
+        self.hub.resync(seq)
+        versions.shared = True
+
+    def _on_terminated(self, connection) -> None:
+        if connection is not self._conn:
+            return
+        # Until the listener is back, other workers' writes go unseen: ETags
+        # come from the database and tool results are kept per turn.
+        versions.shared = False
+        self._conn = None
+        logger.error("Change feed connection lost, reconnecting")
+        if self._reconnect is None:
+            self._reconnect = asyncio.get_running_loop().create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self) -> None:
+        delay = RECONNECT_SECONDS
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                try:
+                    await self._connect()
+                except Exception:
+                    logger.warning("Change feed reconnect failed, retrying in %.0fs", delay, exc_info=True)
+                    delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+                else:
+                    logger.info("Change feed reconnected at seq %d", self.hub.seq)
+                    return
+        finally:
+            self._reconnect = None
+
+    async def publish(self, resource: str, action: str, user_id: int, data: Dict[str, Any]) -> int:
+        """Notify every worker of a change; returns its sequence number."""
+        # One asyncpg connection cannot run statements concurrently.
+        async with self._lock:
+            if self._conn is None:
+                raise ConnectionError("Change feed connection is down")
+            return await self._conn.fetchval(
+                f"SELECT seq FROM (SELECT nextval('{self.SEQUENCE}') AS seq) s, LATERAL (SELECT pg_notify($1, "
+                "json_build_object('seq', s.seq, 'resource', $2::text, 'action', $3::text, 'user_id', $4::int, "
+                "'data', $5::json)::text)) n",
+                self.CHANNEL, resource, action, user_id, json.dumps(data),
+            )
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            self.hub.deliver(ChangeEvent(
+                seq=event["seq"],
+                resource=event["resource"],
+                action=event["action"],
+                user_id=event["user_id"],
+                data=event.get("data") or {},
+            ))
+        except Exception:
+            logger.exception("Ignoring malformed change notification: %s", payload)
+
+
+changes = ChangeHub(settings.CHANGE_FEED_HISTORY, settings.CHANGE_FEED_USERS)
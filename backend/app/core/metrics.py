@@ -0,0 +1,42 @@
+from collections import defaultdict
+from typing import Any, Dict
+
+
+class Metrics:
+    """Process-local counters and timings, exposed as-is on ``/metrics``."""
+
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        self._counters[name] += value
+
+    def observe(self, name: str, seconds: float) -> None:
+        timing = self._timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+
+    def counter(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def mean(self, name: str) -> float:
+        timing = self._timings.get(name)
+        return timing["total"] / timing["count"] if timing else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "counters": dict(self._counters),
+            "timings": {
+                name: {**t, "mean": t["total"] / t["count"]}
+                for name, t in self._timings.items()
+            },
+        }
+
+    def reset(self) -> None:
+        self._counters.clear()
+        self._timings.clear()
+
+
+metrics = Metrics()
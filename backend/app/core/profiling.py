@@ -0,0 +1,237 @@
+import asyncio
+import cProfile
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.log import request_id_var
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CPROFILE = "cprofile"
+SAMPLE = "sample"
+MODES = (CPROFILE, SAMPLE)
+
+# Characters kept from the path and client-supplied request ID in file names
+UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def collapse(frame) -> str:
+    """One stack in collapsed ("folded") form, root first, as flamegraph.pl and speedscope read it."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def write_folded(path: str, stacks: Counter) -> None:
+    with open(path, "a") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+class StackSampler:
+    """Samples one thread's stack at a fixed interval from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+
+class LoopWatchdog:
+    """Logs and records the loop thread's stack whenever the event loop stalls for over ``threshold`` seconds."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.threshold: Optional[float] = None
+        self._beat = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self._task is not None
+
+    def start(self, threshold: float) -> None:
+        self.stop()
+        self.threshold = threshold
+        self._beat = time.monotonic()
+        self._stop = threading.Event()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._monitor = threading.Thread(
+            target=self._watch, args=(threading.get_ident(), threshold, self._stop), name="loop-watchdog", daemon=True
+        )
+        self._monitor.start()
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._monitor is not None:
+            # Not joined: that would block the loop, and the thread exits within threshold / 4
+            self._stop.set()
+            self._monitor = None
+        self.threshold = None
+
+    async def _heartbeat(self) -> None:
+        interval = self.threshold / 4
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = now - expected
+            if lag > self.threshold:
+                metrics.observe("loop.lag", lag)
+
+    def _watch(self, loop_thread: int, threshold: float, stop: threading.Event) -> None:
+        stalled_since = None
+        while not stop.wait(threshold / 4):
+            behind = time.monotonic() - self._beat
+            if behind <= threshold:
+                stalled_since = None
+                continue
+            if stalled_since == self._beat:
+                continue
+            stalled_since = self._beat
+            frame = sys._current_frames().get(loop_thread)
+            stack = collapse(frame) if frame is not None else "unknown"
+            metrics.incr("loop.stalls")
+            logger.warning("Event loop blocked for %.0f ms", behind * 1000, extra={"stack": stack})
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                write_folded(os.path.join(self.directory, "stalls.folded"), Counter({stack: 1}))
+            except OSError as e:
+                logger.warning("Error writing stall stack: %s", e)
+
+
+@dataclass(frozen=True)
+class ProfileConfig:
+    mode: str
+    routes: Tuple[str, ...] = ()
+    sample_interval: float = 0.005
+
+
+class Profiler:
+    """Per-request profiling (cProfile or stack sampling) of selected routes, switched on at runtime."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.config: Optional[ProfileConfig] = None
+        self.watchdog = LoopWatchdog(directory)
+        self._cprofile_busy = False
+
+    def enable(self, config: ProfileConfig) -> None:
+        self.config = config
+        logger.info("Profiling enabled: %s on %s", config.mode, ", ".join(config.routes) or "all routes")
+
+    def disable(self) -> None:
+        self.config = None
+
+    def shutdown(self) -> None:
+        self.disable()
+        self.watchdog.stop()
+
+    def matches(self, path: str) -> bool:
+        routes = self.config.routes if self.config else ()
+        return not routes or any(path.startswith(r) for r in routes)
+
+    async def files(self, limit: int = 50) -> List[Dict[str, object]]:
+        return await asyncio.to_thread(self._list_files, limit)
+
+    def _list_files(self, limit: int) -> List[Dict[str, object]]:
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.is_file()]
+        except FileNotFoundError:
+            return []
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        return [{"name": e.name, "size": e.stat().st_size} for e in entries[:limit]]
+
+    def _output(self, path: str, suffix: str) -> str:
+        route = UNSAFE_NAME.sub("", path.strip("/").replace("/", "_"))[:80] or "root"
+        request_id = UNSAFE_NAME.sub("", request_id_var.get())[:64] or "-"
+        return os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{route}-{request_id}{suffix}")
+
+    async def _write(self, write, path: str, *args) -> None:
+        """Write a profile off the loop; the response has gone out, so failures are only logged."""
+        def write_in_directory():
+            os.makedirs(self.directory, exist_ok=True)
+            write(path, *args)
+
+        try:
+            await asyncio.to_thread(write_in_directory)
+        except Exception:
+            logger.exception("Could not write profile %s", path)
+
+    async def run(self, config: ProfileConfig, app, scope, receive, send) -> None:
+        if config.mode == SAMPLE:
+            sampler = StackSampler(threading.get_ident(), config.sample_interval).start()
+            try:
+                await app(scope, receive, send)
+            finally:
+                stacks = sampler.stop()
+                if stacks:
+                    await self._write(write_folded, self._output(scope["path"], ".folded"), stacks)
+            return
+
+        if self._cprofile_busy:
+            await app(scope, receive, send)
+            return
+        self._cprofile_busy = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                await app(scope, receive, send)
+            finally:
+                profile.disable()
+            await self._write(profile.dump_stats, self._output(scope["path"], ".prof"))
+        finally:
+            self._cprofile_busy = False
+
+
+class ProfilingMiddleware:
+    """Profiles matching requests while profiling is on; a single attribute check otherwise."""
+
+    def __init__(self, app, profiler: "Profiler"):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        config = self.profiler.config
+        if config is None or scope["type"] != "http" or not self.profiler.matches(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        await self.profiler.run(config, self.app, scope, receive, send)
+
+
+profiler = Profiler(settings.PROFILE_DIR)
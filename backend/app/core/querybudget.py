@@ -0,0 +1,107 @@
+import functools
+import inspect
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Tuple, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.db import async_engine, read_engine
+
+logger = logging.getLogger(__name__)
+
+Budget = Union[int, Callable[..., int]]
+
+
+@dataclass
+class QueryCount:
+    statements: int = 0
+    commits: int = 0
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# Every counter active in the current context; nested scopes all count.
+_active: ContextVar[Tuple[QueryCount, ...]] = ContextVar("query_counters", default=())
+
+# Declared budgets by qualified function name, for inspection and tooling.
+BUDGETS: Dict[str, Tuple[Budget, Budget]] = {}
+
+
+def _on_execute(conn, cursor, statement, parameters, context, executemany):
+    for counter in _active.get():
+        counter.statements += 1
+
+
+def _on_commit(conn):
+    for counter in _active.get():
+        counter.commits += 1
+
+
+def install(engine: Engine) -> None:
+    """Count statements and commits on ``engine`` (the sync engine behind an async one)."""
+    if not event.contains(engine, "before_cursor_execute", _on_execute):
+        event.listen(engine, "before_cursor_execute", _on_execute)
+        event.listen(engine, "commit", _on_commit)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCount]:
+    """Count the SQL statements and commits issued inside the block."""
+    counter = QueryCount()
+    token = _active.set(_active.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _active.reset(token)
+
+
+def query_budget(statements: Budget, commits: Budget = 0):
+    """Declare how many statements and commits an async function may make; callable budgets get its arguments."""
+    def decorator(func):
+        BUDGETS[f"{func.__module__}.{func.__qualname__}"] = (statements, commits)
+        if settings.QUERY_BUDGET_MODE == "off":
+            return func
+        signature = inspect.signature(func)
+
+        def limit(budget: Budget, args, kwargs) -> int:
+            if not callable(budget):
+                return budget
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k in inspect.signature(budget).parameters}
+            return budget(**params)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with count_queries() as counter:
+                result = await func(*args, **kwargs)
+            max_statements = limit(statements, args, kwargs)
+            max_commits = limit(commits, args, kwargs)
+            if counter.statements > max_statements or counter.commits > max_commits:
+                message = (
+                    f"{func.__module__}.{func.__qualname__} made {counter.statements} statements / "
+                    f"{counter.commits} commits (budget {max_statements} / {max_commits})"
+                )
+                logger.warning("Query budget exceeded: %s", message)
+                if settings.QUERY_BUDGET_MODE == "raise":
+                    raise QueryBudgetExceeded(message)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+if async_engine is not None:
+    install(async_engine.sync_engine)
+# The read engine is either its own engine or a view of the primary's pool
+# (whose events already fire for it).
+if read_engine is not None and read_engine.sync_engine.pool is not async_engine.sync_engine.pool:
+    install(read_engine.sync_engine)
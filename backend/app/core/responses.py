@@ -0,0 +1,31 @@
+from typing import Any, Dict, Optional
+import orjson
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, falling back to ``str`` for unknown types."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+def success_response(
+    data: Any = None,
+    message: str = "Operation successful",
+    code: int = status.HTTP_200_OK,
+    metadata: Optional[Dict[str, Any]] = None,
+    status_code: Optional[int] = None,
+) -> ORJSONResponse:
+    """A ``BaseResponse``-shaped payload, serialized directly instead of validated again."""
+    return ORJSONResponse(
+        status_code=status_code or code,
+        content={
+            "status": "success",
+            "code": code,
+            "message": message,
+            "data": data,
+            "metadata": metadata,
+        },
+    )
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import os
+import socket
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Field, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import async_session
+from app.core.metrics import metrics
+from app.core.querybudget import query_budget
+
+logger = logging.getLogger(__name__)
+
+# Longest the loop sleeps, so a lease held by a worker that died is retried
+# promptly and clock changes are picked up.
+POLL_SECONDS = 60.0
+
+
+async def yield_to_requests() -> None:
+    """Let request handling run between the units of a long background job."""
+    await asyncio.sleep(0)
+
+
+class BackgroundLoop:
+    """Calls ``run`` in a task from start() to stop(), ``interval()`` seconds apart, logging failures."""
+
+    def __init__(self, name: str, run: Callable[[], Awaitable[Any]], interval: Callable[[], float]):
+        self.name = name
+        self.run = run
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("%s failed", self.name)
+            await asyncio.sleep(self.interval())
+
+
+class JobLease(SQLModel, table=True):
+    """Which worker runs a scheduled job until when, and the last slot it completed."""
+    __tablename__ = "job_leases"
+
+    name: str = Field(primary_key=True)
+    owner: Optional[str] = Field(default=None)
+    expires_at: Optional[datetime] = Field(default=None)
+    # Scheduled time (local) of the last completed run
+    last_slot: Optional[datetime] = Field(default=None)
+
+
+# What acquire_lease found.
+LEASE_ACQUIRED = "acquired"
+LEASE_HELD = "held"
+LEASE_DONE = "done"
+
+
+@query_budget(statements=3, commits=1)
+async def acquire_lease(db: AsyncSession, name: str, owner: str, slot: datetime, ttl: float) -> str:
+    """Take the lease on ``name`` for ``slot``, or report that the slot already ran or is held elsewhere."""
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(JobLease)
+        .where(
+            JobLease.name == name,
+            or_(JobLease.last_slot.is_(None), JobLease.last_slot < slot),
+            or_(JobLease.owner.is_(None), JobLease.expires_at < now),
+        )
+        .values(owner=owner, expires_at=now + timedelta(seconds=ttl))
+    )
+    if result.rowcount == 0:
+        # First run anywhere, the slot already ran, or somebody else holds it; the row tells which.
+        row = (await db.execute(select(JobLease.last_slot).where(JobLease.name == name))).first()
+        if row is not None:
+            await db.rollback()
+            return LEASE_DONE if row.last_slot is not None and row.last_slot >= slot else LEASE_HELD
+        db.add(JobLease(name=name, owner=owner, expires_at=now + timedelta(seconds=ttl)))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another worker inserted the row first
+        await db.rollback()
+        return LEASE_HELD
+    return LEASE_ACQUIRED
+
+
+@query_budget(statements=1, commits=1)
+async def release_lease(db: AsyncSession, name: str, owner: str, slot: Optional[datetime]) -> None:
+    """Give the lease back, recording ``slot`` as done (``None`` when the run failed)."""
+    values: Dict[str, Any] = {"owner": None, "expires_at": None}
+    if slot is not None:
+        values["last_slot"] = slot
+    await db.execute(update(JobLease).where(JobLease.name == name, JobLease.owner == owner).values(**values))
+    await db.commit()
+
+
+@dataclass
+class Job:
+    """A coroutine run daily at local time ``at``; leased jobs run in one worker per slot."""
+
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    at: time
+    leased: bool = True
+
+    def slot(self, now: datetime) -> datetime:
+        """The most recent scheduled time at or before ``now``."""
+        slot = datetime.combine(now.date(), self.at)
+        return slot if slot <= now else slot - timedelta(days=1)
+
+
+class Scheduler:
+    """In-process daily jobs; a slot missed while no worker was up runs on start."""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.jobs: Dict[str, Job] = {}
+        self._done: Dict[str, datetime] = {}
+        self._loop = BackgroundLoop("Scheduler pass", self.run_due, lambda: self._sleep_for(datetime.now()))
+
+    def add(self, job: Job) -> None:
+        self.jobs[job.name] = job
+
+    def start(self) -> None:
+        if settings.SCHEDULER_ENABLED and self.jobs:
+            self._loop.start()
+
+    async def stop(self) -> None:
+        await self._loop.stop()
+
+    async def run_due(self, now: Optional[datetime] = None) -> List[str]:
+        """Run every job whose current slot this worker hasn't seen done; returns the names that ran here."""
+        now = now or datetime.now()
+        ran = []
+        for job in self.jobs.values():
+            slot = job.slot(now)
+            if self._done.get(job.name, datetime.min) >= slot:
+                continue
+            if job.leased:
+                async with self.session_factory() as session:
+                    lease = await acquire_lease(session, job.name, self.owner, slot, settings.JOB_LEASE_SECONDS)
+                if lease == LEASE_DONE:
+                    self._done[job.name] = slot
+                    continue
+                if lease == LEASE_HELD:
+                    # Running elsewhere; a crashed holder's lease expires and is retried.
+                    continue
+            completed = await self._execute(job)
+            if job.leased:
+                async with self.session_factory() as session:
+                    await release_lease(session, job.name, self.owner, slot if completed else None)
+            # A failed run is left to the other workers (or the next start)
+            self._done[job.name] = slot
+            if completed:
+                ran.append(job.name)
+        return ran
+
+    async def _execute(self, job: Job) -> bool:
+        started = datetime.now()
+        try:
+            await job.run()
+        except Exception:
+            metrics.incr("scheduler.failures")
+            logger.exception("Scheduled job %s failed", job.name)
+            return False
+        elapsed = (datetime.now() - started).total_seconds()
+        metrics.observe(f"scheduler.{job.name}.seconds", elapsed)
+        logger.info("Scheduled job %s finished in %.2fs", job.name, elapsed)
+        return True
+
+    def _sleep_for(self, now: datetime) -> float:
+        upcoming = min(job.slot(now) + timedelta(days=1) for job in self.jobs.values())
+        return max(1.0, min(POLL_SECONDS, (upcoming - now).total_seconds()))
+
+
+scheduler = Scheduler(async_session)
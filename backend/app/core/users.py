@@ -0,0 +1,77 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, List
+
+from app.core.config import settings
+from app.core.responses import ORJSONResponse
+from app.core.schemas import ErrorResponse
+
+# User the current request acts for; everything outside a request is the default user.
+current_user_var: ContextVar[int] = ContextVar("current_user", default=settings.DEFAULT_USER_ID)
+
+
+def current_user_id() -> int:
+    return current_user_var.get()
+
+
+class UserContextMiddleware:
+    """Sets the current user from ``X-User-Id`` when TRUST_USER_HEADER is on, else the default user."""
+
+    header = b"x-user-id"
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        raw = dict(scope["headers"]).get(self.header) if settings.TRUST_USER_HEADER else None
+        if raw is None:
+            user_id = settings.DEFAULT_USER_ID
+        elif raw.isdigit() and int(raw) > 0:
+            user_id = int(raw)
+        else:
+            response = ORJSONResponse(
+                status_code=400,
+                content=ErrorResponse(code=400, message="Invalid X-User-Id header").model_dump(),
+            )
+            await response(scope, receive, send)
+            return
+
+        token = current_user_var.set(user_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_user_var.reset(token)
+
+
+class UserLimiter:
+    """Per-user concurrency slots, kept only while the user has requests in flight."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._slots: Dict[int, List] = {}
+
+    def in_flight(self, user_id: int) -> int:
+        entry = self._slots.get(user_id)
+        return entry[1] if entry else 0
+
+    @asynccontextmanager
+    async def slot(self, user_id: int) -> AsyncIterator[None]:
+        entry = self._slots.get(user_id)
+        if entry is None:
+            entry = self._slots[user_id] = [asyncio.Semaphore(self.limit), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._slots[user_id]
+
+
+user_limiter = UserLimiter(settings.USER_MAX_CONCURRENT_REQUESTS)
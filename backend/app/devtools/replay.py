@@ -0,0 +1,160 @@
+"""
+Re-drive captured API traffic against a running backend and compare runs.
+
+    # Record: start the backend with CAPTURE_PATH=capture.jsonl.gz
+    # Replay: start the build under test with REPLAY_CAPTURE_PATH=capture.jsonl.gz
+    # (and TRUST_USER_HEADER=true to replay each request as its recorded user)
+    python -m app.devtools.replay run capture.jsonl.gz --base-url http://localhost:8000 --speed 4 --out a.jsonl
+    python -m app.devtools.replay compare a.jsonl b.jsonl
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+import orjson
+
+from app.modules.gemini.replay import read_capture
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def route_of(record: Dict[str, Any]) -> str:
+    return f"{record['method']} {record['path']}"
+
+
+async def replay(records: List[Dict[str, Any]], base_url: str, speed: float, concurrency: int, timeout: float) -> List[Dict[str, Any]]:
+    records = sorted(records, key=lambda r: r["at"])
+    origin = records[0]["at"] if records else 0.0
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[Dict[str, Any]] = []
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        started = time.perf_counter()
+
+        async def send(record: Dict[str, Any]) -> None:
+            if speed > 0:
+                await asyncio.sleep(max(0.0, (record["at"] - origin) / speed - (time.perf_counter() - started)))
+            async with semaphore:
+                sent = time.perf_counter()
+                try:
+                    response = await client.request(
+                        record["method"],
+                        f"{record['path']}?{record['query']}" if record["query"] else record["path"],
+                        content=record["body"].encode() if record.get("body") else None,
+                        headers={
+                            # The replay chat model serves this request's recorded LLM steps by it
+                            "X-Request-ID": record["request_id"],
+                            "X-User-Id": str(record.get("user_id", 1)),
+                            "Content-Type": "application/json",
+                        },
+                    )
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = 0
+                    print(f"{route_of(record)} failed: {e}", file=sys.stderr)
+                results.append({
+                    "request_id": record["request_id"],
+                    "method": record["method"],
+                    "path": record["path"],
+                    "status": status,
+                    "latency": time.perf_counter() - sent,
+                    "recorded_latency": record["duration"],
+                    "recorded_status": record["status"],
+                })
+
+        await asyncio.gather(*(send(r) for r in records))
+    return results
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    by_route: Dict[str, List[float]] = defaultdict(list)
+    for r in results:
+        if not r["status"]:
+            continue
+        by_route[route_of(r)].append(r["latency"])
+        by_route["ALL"].append(r["latency"])
+    return {
+        route: {
+            "count": len(latencies),
+            "mean": statistics.fmean(latencies),
+            **{f"p{p}": percentile(latencies, p) for p in PERCENTILES},
+        }
+        for route, latencies in by_route.items()
+    }
+
+
+def read_results(path: str) -> List[Dict[str, Any]]:
+    with open(path, "rb") as f:
+        return [orjson.loads(line) for line in f if line.strip()]
+
+
+def print_summary(summary: Dict[str, Dict[str, float]]) -> None:
+    columns = ["mean", *(f"p{p}" for p in PERCENTILES)]
+    print(f"{'route':<40} {'count':>6} " + " ".join(f"{c + ' ms':>10}" for c in columns))
+    for route, stats in sorted(summary.items()):
+        print(f"{route:<40} {stats['count']:>6} " + " ".join(f"{stats[c] * 1000:>10.1f}" for c in columns))
+
+
+def _ms(seconds: Optional[float]) -> str:
+    return f"{seconds * 1000:>10.1f}" if seconds is not None else f"{'-':>10}"
+
+
+def print_comparison(a: Dict[str, Dict[str, float]], b: Dict[str, Dict[str, float]]) -> None:
+    columns = ["mean", *(f"p{p}" for p in PERCENTILES)]
+    print(f"{'route':<40} {'stat':>5} {'A ms':>10} {'B ms':>10} {'change':>8}")
+    for route in sorted(set(a) | set(b)):
+        for column in columns:
+            before = a.get(route, {}).get(column)
+            after = b.get(route, {}).get(column)
+            if before is None or after is None:
+                change = "n/a"
+            else:
+                change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+            print(f"{route:<40} {column:>5} {_ms(before)} {_ms(after)} {change:>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.devtools.replay", description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="replay a capture against a running backend")
+    run.add_argument("capture")
+    run.add_argument("--base-url", default="http://localhost:8000")
+    run.add_argument("--speed", type=float, default=1.0, help="pacing multiplier; 0 sends back to back")
+    run.add_argument("--concurrency", type=int, default=32)
+    run.add_argument("--timeout", type=float, default=120.0)
+    run.add_argument("--out", help="write per-request results as JSONL for a later compare")
+
+    compare = commands.add_parser("compare", help="compare latency distributions of two replay runs")
+    compare.add_argument("a")
+    compare.add_argument("b")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = asyncio.run(replay(read_capture(args.capture), args.base_url, args.speed, args.concurrency, args.timeout))
+        if args.out:
+            with open(args.out, "wb") as f:
+                f.writelines(orjson.dumps(r) + b"\n" for r in results)
+        mismatched = sum(1 for r in results if r["status"] != r["recorded_status"])
+        print_summary(summarize(results))
+        if mismatched:
+            print(f"\n{mismatched} of {len(results)} responses had a different status than recorded")
+    else:
+        print_comparison(summarize(read_results(args.a)), summarize(read_results(args.b)))
+
+
+if __name__ == "__main__":
+    main()
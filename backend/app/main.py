@@ -1,28 +1,64 @@
 from contextlib import asynccontextmanager
+from datetime import time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.capture import CaptureMiddleware, recorder
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
 from app.core.db import sync_engine, async_engine
+from app.core.events import changes
 from app.core.exceptions import add_exception_handlers
+from app.core.log import RequestIdMiddleware, setup_logging, shutdown_logging
+from app.core.metrics import metrics
+from app.core.profiling import ProfilingMiddleware, profiler
+from app.core.responses import ORJSONResponse
+from app.core.scheduler import Job, scheduler
+from app.core.users import UserContextMiddleware
 from sqlmodel import SQLModel
+from app.modules.chat.archive import archiver
 from app.modules.chat.router import router as chat_router
+from app.modules.gemini.knowledge import knowledge_index
+from app.modules.gemini.service import warm_gemini_service
+from app.modules.review import service as review_service
+from app.modules.changes.router import router as changes_router
+from app.modules.admin.router import router as admin_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events."""
+    setup_logging()
     # Startup: Create tables
     async with async_engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+    await changes.start()
+    recorder.start()
+    # Move messages past the retention window into the archive
+    archiver.start()
+    # Index the knowledge directory before the first turn needs it
+    knowledge_index.refresh()
+    # Daily review snapshots (once across workers) and LLM warm-up (per
+    # worker); both also run at startup if today's slot has already passed
+    review_at = time.fromisoformat(settings.DAILY_REVIEW_AT)
+    scheduler.add(Job("daily_snapshots", review_service.run_daily_snapshots, at=review_at))
+    scheduler.add(Job("warm_llm", warm_gemini_service, at=review_at, leased=False))
+    scheduler.start()
     yield
-    # Shutdown: Close engine
+    # Shutdown: Stop the change feed and close engine
+    await scheduler.stop()
+    await archiver.stop()
+    await changes.stop()
+    recorder.stop()
+    profiler.shutdown()
     await async_engine.dispose()
+    shutdown_logging()
 
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -34,13 +70,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profile selected routes while switched on via the admin API
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+# Record API traffic for replay when CAPTURE_PATH is set (inside the request ID)
+app.add_middleware(CaptureMiddleware, recorder=recorder)
+
+# Resolve the user each request acts for (before capture, so records carry it)
+app.add_middleware(UserContextMiddleware)
+
+# Tag every request (and its log records) with a correlation ID
+app.add_middleware(RequestIdMiddleware)
+
+# Compress large responses (outermost, so capture and profiling see plain bodies)
+app.add_middleware(CompressionMiddleware)
+
 # Add Exception Handlers
 add_exception_handlers(app)
 
 # Include Routers
 app.include_router(chat_router, prefix=f"{settings.API_V1_STR}/chat", tags=["chat"])
+app.include_router(changes_router, prefix=f"{settings.API_V1_STR}/changes", tags=["changes"])
+app.include_router(admin_router, prefix=f"{settings.API_V1_STR}/admin", tags=["admin"])
 
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
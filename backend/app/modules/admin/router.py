@@ -0,0 +1,64 @@
+import secrets
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+from app.core.profiling import ProfileConfig, profiler
+from app.core.responses import success_response
+from app.core.schemas import BaseResponse
+
+
+async def require_admin(x_admin_token: str = Header("")):
+    """Admin endpoints answer 404 unless ADMIN_TOKEN is set and matches ``X-Admin-Token``."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+class ProfilingRequest(BaseModel):
+    mode: Optional[Literal["cprofile", "sample"]] = None
+    routes: List[str] = Field(default_factory=list, description="Path prefixes to profile; empty means all")
+    sample_interval_ms: float = Field(5.0, gt=0)
+    watchdog_ms: Optional[float] = Field(None, gt=0, description="Report event loop stalls longer than this")
+
+
+async def _state():
+    config = profiler.config
+    return {
+        "mode": config.mode if config else None,
+        "routes": list(config.routes) if config else [],
+        "sample_interval_ms": config.sample_interval * 1000 if config else None,
+        "watchdog_ms": profiler.watchdog.threshold * 1000 if profiler.watchdog.active else None,
+        "directory": profiler.directory,
+        "files": await profiler.files(),
+    }
+
+
+@router.get("/profiling", response_model=BaseResponse, status_code=status.HTTP_200_OK)
+async def get_profiling():
+    return success_response(message="Profiling state", data=await _state())
+
+
+@router.put("/profiling", response_model=BaseResponse, status_code=status.HTTP_200_OK)
+async def set_profiling(body: ProfilingRequest):
+    if body.mode:
+        profiler.enable(ProfileConfig(body.mode, tuple(body.routes), body.sample_interval_ms / 1000))
+    else:
+        profiler.disable()
+    if body.watchdog_ms:
+        profiler.watchdog.start(body.watchdog_ms / 1000)
+    else:
+        profiler.watchdog.stop()
+    return success_response(message="Profiling updated", data=await _state())
+
+
+@router.delete("/profiling", response_model=BaseResponse, status_code=status.HTTP_200_OK)
+async def stop_profiling():
+    profiler.shutdown()
+    return success_response(message="Profiling stopped", data=await _state())
@@ -0,0 +1,73 @@
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from app.core.events import changes
+from app.core.responses import success_response
+from app.core.schemas import BaseResponse
+
+router = APIRouter()
+
+# Interval between SSE keep-alive comments while nothing changes.
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+def _parse_resources(resources: Optional[str]):
+    return [r.strip() for r in resources.split(",") if r.strip()] if resources else None
+
+
+async def _event_stream(request: Request, since: int, resources):
+    seq = since
+    while not await request.is_disconnected():
+        events, reset = await changes.wait(seq, SSE_KEEPALIVE_SECONDS, resources)
+        if reset:
+            yield f"event: reset\ndata: {json.dumps({'seq': changes.seq})}\n\n"
+            seq = changes.seq
+            continue
+        if not events:
+            seq = max(seq, changes.seq)
+            yield ": keep-alive\n\n"
+            continue
+        for event in events:
+            yield f"id: {event.seq}\nevent: change\ndata: {json.dumps(event.to_dict())}\n\n"
+            seq = event.seq
+
+
+@router.get("/", response_model=BaseResponse, status_code=status.HTTP_200_OK)
+async def get_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    timeout: float = Query(25.0, ge=0, le=60),
+    resources: Optional[str] = Query(None, description="Comma-separated resource filter"),
+):
+    """Changes after ``since``, long-polled for up to ``timeout`` seconds, or as Server-Sent Events."""
+    wanted = _parse_resources(resources)
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        last_event_id = request.headers.get("last-event-id", "")
+        if since is not None:
+            start = since
+        elif last_event_id.isdigit():
+            start = int(last_event_id)
+        else:
+            start = changes.seq
+        return StreamingResponse(
+            _event_stream(request, start, wanted),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    start = since if since is not None else changes.seq
+    events, reset = await changes.wait(start, timeout, wanted)
+    # With nothing to return, everything up to the current sequence has been
+    # seen (or filtered out), so the client can resume from there.
+    next_seq = events[-1].seq if events else max(start, changes.seq)
+
+    return success_response(
+        code=status.HTTP_200_OK,
+        message="Changes retrieved",
+        data=[e.to_dict() for e in events],
+        metadata={"seq": next_seq, "reset": reset},
+    )
@@ -0,0 +1,189 @@
+import logging
+import zlib
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+import orjson
+from sqlalchemy import delete, func, insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import MESSAGES
+from app.core.config import settings
+from app.core.db import async_session
+from app.core.events import changes
+from app.core.metrics import metrics
+from app.core.querybudget import query_budget
+from app.core.scheduler import BackgroundLoop, yield_to_requests
+from app.modules.chat.models import Message, MessageArchive, MessageDigest
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = (
+    Message.id,
+    Message.user_id,
+    Message.role,
+    Message.content,
+    Message.extra,
+    Message.created_at,
+)
+
+# Characters of each user message kept in a day's digest summary
+DIGEST_LINE_CHARS = 160
+
+
+def pack(messages: List[Dict[str, Any]]) -> bytes:
+    return zlib.compress(orjson.dumps(messages))
+
+
+def unpack(payload: bytes) -> List[Dict[str, Any]]:
+    messages = orjson.loads(zlib.decompress(payload))
+    for message in messages:
+        message["created_at"] = datetime.fromisoformat(message["created_at"])
+    return messages
+
+
+def _summarize(existing: str, messages: List[Dict[str, Any]]) -> str:
+    lines = [existing] if existing else []
+    for m in messages:
+        if m["role"] == "user":
+            text = " ".join(m["content"].split())
+            lines.append(f"{m['created_at']:%H:%M} {text[:DIGEST_LINE_CHARS]}")
+    return "\n".join(lines)[: settings.MESSAGE_DIGEST_MAX_CHARS]
+
+
+@query_budget(statements=7, commits=1)
+async def archive_batch(db: AsyncSession, cutoff: datetime, batch_size: int) -> Dict[int, int]:
+    """Move up to ``batch_size`` messages older than ``cutoff`` into per-day archives and digests; returns counts per user."""
+    result = await db.execute(
+        select(*ARCHIVE_COLUMNS)
+        .where(Message.created_at < cutoff)
+        .order_by(Message.user_id, Message.created_at, Message.id)
+        .limit(batch_size)
+    )
+    rows = [dict(row) for row in result.mappings()]
+    if not rows:
+        return {}
+
+    groups: Dict[Tuple[int, date], List[Dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        user_id = row.pop("user_id")
+        groups[(user_id, row["created_at"].date())].append(row)
+
+    await db.execute(insert(MessageArchive), [
+        {
+            "user_id": user_id,
+            "day": day,
+            "message_count": len(messages),
+            "first_created_at": messages[0]["created_at"],
+            "last_created_at": messages[-1]["created_at"],
+            "payload": pack(messages),
+            "created_at": datetime.utcnow(),
+        }
+        for (user_id, day), messages in groups.items()
+    ])
+
+    users = {user_id for user_id, _ in groups}
+    days = {day for _, day in groups}
+    result = await db.exec(
+        select(MessageDigest).where(MessageDigest.user_id.in_(users), MessageDigest.day.in_(days))
+    )
+    digests = {(d.user_id, d.day): d for d in result.all()}
+    for (user_id, day), messages in groups.items():
+        digest = digests.get((user_id, day)) or MessageDigest(user_id=user_id, day=day)
+        digest.message_count += len(messages)
+        digest.user_messages += sum(1 for m in messages if m["role"] == "user")
+        digest.assistant_messages += sum(1 for m in messages if m["role"] == "assistant")
+        digest.summary = _summarize(digest.summary, messages)
+        db.add(digest)
+
+    ids = [row["id"] for row in rows]
+    deleted = await db.execute(delete(Message).where(Message.id.in_(ids)))
+    if deleted.rowcount != len(ids):
+        # Another worker archived some of these first; leave the batch to it.
+        await db.rollback()
+        return {}
+    await db.commit()
+
+    archived: Dict[int, int] = defaultdict(int)
+    for (user_id, _), messages in groups.items():
+        archived[user_id] += len(messages)
+    return archived
+
+
+@query_budget(statements=1)
+async def archived_count(db: AsyncSession, user_id: int) -> int:
+    result = await db.execute(
+        select(func.coalesce(func.sum(MessageArchive.message_count), 0)).where(MessageArchive.user_id == user_id)
+    )
+    return result.scalar()
+
+
+@query_budget(statements=2)
+async def archived_page(db: AsyncSession, user_id: int, skip: int, limit: int) -> List[Dict[str, Any]]:
+    """Archived messages ``skip`` to ``skip + limit``, newest first, decompressing only the batches needed."""
+    result = await db.execute(
+        select(MessageArchive.id, MessageArchive.message_count)
+        .where(MessageArchive.user_id == user_id)
+        .order_by(MessageArchive.last_created_at.desc(), MessageArchive.id.desc())
+    )
+    wanted: List[Tuple[int, int]] = []
+    position = 0
+    for archive_id, count in result.all():
+        if position + count > skip:
+            wanted.append((archive_id, position))
+        position += count
+        if position >= skip + limit:
+            break
+    if not wanted:
+        return []
+
+    result = await db.execute(
+        select(MessageArchive.id, MessageArchive.payload).where(MessageArchive.id.in_([a for a, _ in wanted]))
+    )
+    payloads = dict(result.all())
+    messages: List[Dict[str, Any]] = []
+    for archive_id, start in wanted:
+        newest_first = unpack(payloads[archive_id])[::-1]
+        messages.extend(newest_first[max(0, skip - start): skip + limit - start])
+    return messages[:limit]
+
+
+class MessageArchiver:
+    """Background job archiving messages older than ``MESSAGE_ARCHIVE_AFTER_DAYS``, batch by batch."""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._loop = BackgroundLoop(
+            "Message archiving", self.run_once, lambda: settings.MESSAGE_ARCHIVE_INTERVAL_SECONDS
+        )
+
+    def start(self) -> None:
+        if settings.MESSAGE_ARCHIVE_AFTER_DAYS > 0:
+            self._loop.start()
+
+    async def stop(self) -> None:
+        await self._loop.stop()
+
+    async def run_once(self) -> int:
+        """Archive everything past the retention window; returns how many messages moved."""
+        cutoff = datetime.utcnow() - timedelta(days=settings.MESSAGE_ARCHIVE_AFTER_DAYS)
+        total = 0
+        while True:
+            async with self.session_factory() as session:
+                archived = await archive_batch(session, cutoff, settings.MESSAGE_ARCHIVE_BATCH_SIZE)
+            for user_id, count in archived.items():
+                await changes.publish(MESSAGES, "archived", {"count": count}, user_id=user_id)
+            moved = sum(archived.values())
+            total += moved
+            if moved < settings.MESSAGE_ARCHIVE_BATCH_SIZE:
+                break
+            await yield_to_requests()
+        if total:
+            metrics.incr("messages.archived", total)
+            logger.info("Archived %d messages older than %s", total, cutoff.date())
+        return total
+
+
+archiver = MessageArchiver(async_session)
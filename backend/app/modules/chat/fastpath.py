@@ -0,0 +1,221 @@
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import versions, HABITS
+from app.core.config import settings
+from app.core.users import current_user_id
+from app.modules.habit import service as habit_service
+from app.modules.journal import service as journal_service
+from app.modules.plan import service as plan_service
+
+# Words that mark a habit as done / not done.
+DONE_WORDS = {"done", "did", "completed", "complete", "finished", "yes", "ok", "✅", "✓"}
+MISSED_WORDS = {"skipped", "skip", "missed", "no", "not", "failed", "❌"}
+
+# Verb and synonym forms that point at a habit name.
+ALIASES = {
+    "slept": "sleep",
+    "exercised": "exercise",
+    "workout": "exercise",
+    "worked out": "exercise",
+    "gym": "exercise",
+    "meditated": "meditation",
+    "meditate": "meditation",
+    "read": "reading",
+    "drank": "water",
+    "hydration": "water",
+}
+
+# Unit suffixes and the value key the agent's save_habits tool uses for them.
+UNITS = {
+    "h": "duration", "hr": "duration", "hrs": "duration", "hour": "duration", "hours": "duration",
+    "m": "minutes", "min": "minutes", "mins": "minutes", "minute": "minutes", "minutes": "minutes",
+    "p": "pages", "page": "pages", "pages": "pages",
+    "km": "distance", "k": "distance",
+    "glass": "glasses", "glasses": "glasses", "cup": "cups", "cups": "cups",
+}
+
+# Words that carry no meaning in a logging clause.
+FILLER = {"i", "my", "the", "a", "for", "of", "today", "got", "have", "has", "was", "is", "it", "about", "also"}
+
+CLAUSE_SPLIT = re.compile(r"\s*(?:,|;|\n|\band\b|\+)\s*")
+NUMBER = re.compile(r"^(\d+(?:\.\d+)?)([a-z]*)$")
+JOURNAL_COMMAND = re.compile(r"^\s*(?:journal|reflection)\s*:\s*(.+)$", re.IGNORECASE | re.DOTALL)
+PLAN_COMMAND = re.compile(r"^\s*(?:plan|plan for tomorrow)\s*:\s*(.+)$", re.IGNORECASE | re.DOTALL)
+
+# Opening words of a question or request, which the agent should answer
+# rather than store.
+QUESTION_WORDS = {
+    "what", "how", "why", "when", "where", "who", "which", "should", "can",
+    "could", "would", "will", "shall", "help",
+}
+
+
+def _is_question(text: str) -> bool:
+    words = text.strip().lower().split(maxsplit=1)
+    return text.rstrip().endswith("?") or (bool(words) and words[0].strip(",") in QUESTION_WORDS)
+
+
+@dataclass
+class FastPathResult:
+    intent: str
+    confidence: float
+    reply: str = ""
+    habits: Dict[str, dict] = field(default_factory=dict)
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[\s_\-]+", " ", name.strip().lower())
+
+
+class HabitNameIndex:
+    """Known habit names per user, reloaded only when that user's habits change."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._users: "OrderedDict[int, Tuple[int, Dict[str, str]]]" = OrderedDict()
+
+    async def get(self, db: AsyncSession) -> Dict[str, str]:
+        user_id = current_user_id()
+        version = versions.version(HABITS, user_id)
+        cached = self._users.get(user_id)
+        if cached is None or cached[0] != version:
+            habits = await habit_service.get_habits(db)
+            cached = (version, {_normalize(h.name): h.name for h in habits})
+            self._users[user_id] = cached
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.maxsize:
+            self._users.popitem(last=False)
+        return cached[1]
+
+    def cached(self) -> List[str]:
+        """The current user's habit names from the last load, without touching the database."""
+        cached = self._users.get(current_user_id())
+        return list(cached[1].values()) if cached else []
+
+
+def _parse_clause(clause: str, names: Dict[str, str]) -> Optional[Tuple[str, dict]]:
+    """Parse "exercise done" / "slept 7h" / "reading 12 pages" into (habit, value)."""
+    text = _normalize(re.sub(r"[.!]+$", "", clause))
+    if not text:
+        return None
+
+    habit = None
+    for alias, target in sorted(ALIASES.items(), key=lambda kv: -len(kv[0])):
+        if re.search(rf"\b{re.escape(alias)}\b", text) and target in names:
+            habit, text = names[target], re.sub(rf"\b{re.escape(alias)}\b", " ", text, count=1)
+            break
+    if habit is None:
+        for normalized in sorted(names, key=len, reverse=True):
+            if re.search(rf"\b{re.escape(normalized)}\b", text):
+                habit, text = names[normalized], re.sub(rf"\b{re.escape(normalized)}\b", " ", text, count=1)
+                break
+    if habit is None:
+        return None
+
+    completed: Optional[bool] = None
+    value: Dict[str, Any] = {}
+    tokens = text.split()
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        number = NUMBER.match(token)
+        if number:
+            amount = float(number.group(1))
+            unit = number.group(2)
+            if not unit and i + 1 < len(tokens) and tokens[i + 1] in UNITS:
+                unit = tokens[i + 1]
+                i += 1
+            if unit and unit not in UNITS:
+                return None
+            value[UNITS[unit] if unit else "value"] = int(amount) if amount.is_integer() else amount
+        elif token in DONE_WORDS:
+            completed = True if completed is None else completed
+        elif token in MISSED_WORDS:
+            completed = False
+        elif token not in FILLER:
+            # Anything we don't understand means the agent should handle it.
+            return None
+        i += 1
+
+    if completed is not None:
+        value["completed"] = completed
+    elif not value:
+        # A bare habit name ("water") reads as done.
+        value["completed"] = True
+    return habit, value
+
+
+def parse(message: str, names: Dict[str, str]) -> Optional[FastPathResult]:
+    if _is_question(message):
+        return None
+    for intent, command in (("journal", JOURNAL_COMMAND), ("plan", PLAN_COMMAND)):
+        match = command.match(message)
+        if match:
+            if _is_question(match.group(1)):
+                return None
+            return FastPathResult(intent=intent, confidence=1.0)
+
+    clauses = [c for c in CLAUSE_SPLIT.split(message.strip()) if c]
+    if not clauses or not names:
+        return None
+    parsed = [_parse_clause(c, names) for c in clauses]
+    habits = {p[0]: p[1] for p in parsed if p}
+    confidence = sum(1 for p in parsed if p) / len(clauses)
+    return FastPathResult(intent="habits", confidence=confidence, habits=habits)
+
+
+class FastPath:
+    """Handles habit, journal and plan messages it parses with full confidence; everything else goes to the agent."""
+
+    def __init__(self, min_confidence: float = 1.0):
+        self.min_confidence = min_confidence
+        self.names = HabitNameIndex()
+
+    async def handle(self, db: AsyncSession, message: str) -> Optional[FastPathResult]:
+        if len(message) > 300:
+            return None
+        result = parse(message, await self.names.get(db))
+        if result is None or result.confidence < self.min_confidence:
+            return None
+
+        today = date.today()
+        if result.intent == "journal":
+            text = JOURNAL_COMMAND.match(message).group(1).strip()
+            existing = await journal_service.get_today_journal(db)
+            meta = existing.meta if existing and existing.meta else {"wins": [], "improvements": []}
+            # Add to today's entry rather than replacing it
+            if existing and existing.text:
+                text = f"{existing.text}\n\n{text}"
+            await journal_service.upsert_daily_journal(db, today, text, meta)
+            result.reply = "Journal entry saved."
+        elif result.intent == "plan":
+            body = PLAN_COMMAND.match(message).group(1)
+            tasks = [t.strip(" -•") for t in re.split(r"[;\n]|,", body) if t.strip(" -•")]
+            tomorrow = today + timedelta(days=1)
+            existing = await plan_service.get_plan(db, tomorrow)
+            if existing:
+                # Add to tomorrow's plan rather than replacing it
+                tasks = existing.tasks + [t for t in tasks if t not in existing.tasks]
+            await plan_service.upsert_plan(db, tomorrow, tasks)
+            result.reply = f"Plan for {tomorrow} saved with {len(tasks)} tasks."
+        else:
+            await habit_service.upsert_habit_entries(db, today, result.habits)
+            logged = [_describe(habit_name, value) for habit_name, value in result.habits.items()]
+            result.reply = f"Logged: {', '.join(logged)}."
+        return result
+
+
+def _describe(habit: str, value: dict) -> str:
+    details = [f"{k} {v}" for k, v in value.items() if k != "completed"]
+    if value.get("completed") is False:
+        details.insert(0, "missed")
+    return f"{habit} ({', '.join(details)})" if details else habit
+
+
+fastpath = FastPath(settings.FASTPATH_MIN_CONFIDENCE)
@@ -1,13 +1,45 @@
-from datetime import datetime
+from datetime import datetime, date as dt_date
 from typing import Optional, Any
-from sqlmodel import Field, SQLModel
-from sqlalchemy import Column, JSON, Text
+from sqlmodel import Field, SQLModel, UniqueConstraint
+from sqlalchemy import Column, Index, JSON, LargeBinary, Text
 
 class Message(SQLModel, table=True):
     __tablename__ = "messages"
+    __table_args__ = (Index("ix_messages_user_created_at", "user_id", "created_at"),)
     
     id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id", nullable=False)
     role: str = Field(sa_column_kwargs={"check_constraint": "role IN ('user', 'assistant')"})
     content: str = Field(sa_column=Column(Text, nullable=False))
     extra: Optional[dict] = Field(default=None, sa_column=Column(JSON))
     created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class MessageArchive(SQLModel, table=True):
+    """One user's messages from one day, moved out of ``messages`` as a compressed batch."""
+    __tablename__ = "message_archives"
+    __table_args__ = (Index("ix_message_archives_user_last_created_at", "user_id", "last_created_at"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id", nullable=False)
+    day: dt_date = Field(nullable=False)
+    message_count: int = Field(nullable=False)
+    first_created_at: datetime = Field(nullable=False)
+    last_created_at: datetime = Field(nullable=False)
+    # zlib-compressed JSON list of messages, oldest first
+    payload: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class MessageDigest(SQLModel, table=True):
+    """Per-day summary of archived messages, kept for context and summaries."""
+    __tablename__ = "message_digests"
+    __table_args__ = (UniqueConstraint("user_id", "day"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id", nullable=False)
+    day: dt_date = Field(nullable=False)
+    message_count: int = Field(default=0, nullable=False)
+    user_messages: int = Field(default=0, nullable=False)
+    assistant_messages: int = Field(default=0, nullable=False)
+    summary: str = Field(default="", sa_column=Column(Text, nullable=False))
@@ -1,42 +1,84 @@
-from fastapi import APIRouter, status, Depends, Query
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
 from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.cache import conditional_response, MESSAGES
 from app.core.schemas import BaseResponse
-from app.modules.chat.service import ChatService
-from app.core.db import get_session
-from app.core.pagination import pagination_helper
+from app.modules.chat.service import ChatService, MESSAGE_FIELDS
+from app.core.config import settings
+from app.core.db import get_read_session, get_session
+from app.core.responses import success_response
+from app.core.users import current_user_id, user_limiter
+from app.modules.user import service as user_service
 
 router = APIRouter()
 
 
-async def get_service(session: AsyncSession = Depends(get_session)) -> ChatService:
-    return ChatService(session)
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in names if f not in MESSAGE_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}; choose from {', '.join(MESSAGE_FIELDS)}",
+        )
+    return names or None
+
+
+async def get_service(session: AsyncSession = Depends(get_session)) -> AsyncIterator[ChatService]:
+    # A bounded number of concurrent requests per user keeps the pool fair
+    async with user_limiter.slot(current_user_id()):
+        await user_service.ensure_user(session)
+        yield ChatService(session)
+
+
+async def get_read_service(session: AsyncSession = Depends(get_read_session)) -> AsyncIterator[ChatService]:
+    async with user_limiter.slot(current_user_id()):
+        yield ChatService(session)
 
 
 @router.post("/", response_model=BaseResponse, status_code=status.HTTP_201_CREATED)
 async def chat(message: str, service: ChatService = Depends(get_service)):
     reply = await service.get_reply(message)
 
-    return BaseResponse(
-        code=status.HTTP_200_OK, 
-        message="Message sent", 
-        data=reply
+    return success_response(
+        code=status.HTTP_200_OK,
+        message="Message sent",
+        data=reply,
+        status_code=status.HTTP_201_CREATED,
     )
 
 
 @router.get("/", response_model=BaseResponse, status_code=status.HTTP_200_OK)
 async def get_messages(
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
-    service: ChatService = Depends(get_service),
+    fields: Optional[str] = Query(None, description="Comma-separated message fields to return"),
+    truncate: Optional[int] = Query(
+        None, ge=1, le=settings.MESSAGE_TRUNCATE_MAX, description="Cut content to this many characters"
+    ),
+    service: ChatService = Depends(get_read_service),
 ):
-    skip = (page - 1) * limit
-    messages, pagination_result = await service.get_messages(skip=skip, limit=limit)
-    
-    return BaseResponse(
-        code=status.HTTP_200_OK, 
-        message="Messages retrieved", 
-        data=messages,
-        metadata={
-            "pagination": pagination_result
-        }
+    selected = _parse_fields(fields)
+
+    async def build():
+        skip = (page - 1) * limit
+        messages, pagination_result = await service.get_messages(
+            skip=skip, limit=limit, fields=selected, truncate=truncate
+        )
+
+        return success_response(
+            code=status.HTTP_200_OK,
+            message="Messages retrieved",
+            data=messages,
+            metadata={
+                "pagination": pagination_result
+            }
+        )
+
+    return await conditional_response(
+        request, [MESSAGES], build, page, limit, ",".join(selected or MESSAGE_FIELDS), truncate,
+        stored_version=service.get_history_version,
     )
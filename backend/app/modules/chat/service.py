@@ -1,7 +1,38 @@
+import time
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select, desc
-from typing import List, Tuple
-from app.modules.chat.models import Message
+from sqlalchemy import func
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.core.cache import MESSAGES
+from app.core.config import settings
+from app.core.events import changes
+from app.core.metrics import metrics
+from app.core.pagination import pagination_helper
+from app.core.querybudget import query_budget
+from app.core.users import current_user_id
+from app.modules.chat.archive import archived_count, archived_page
+from app.modules.chat.fastpath import fastpath
+from app.modules.chat.models import Message, MessageDigest
+
+# Columns the history endpoint can return, by field name. Selecting them
+# explicitly lets the page be read as plain dicts instead of hydrating ORM
+# objects, and lets clients ask for only the fields they show.
+MESSAGE_FIELDS = {
+    "id": Message.id,
+    "role": Message.role,
+    "content": Message.content,
+    "extra": Message.extra,
+    "created_at": Message.created_at,
+}
+
+
+def _project(message: Dict[str, Any], fields: Sequence[str], truncate: Optional[int]) -> Dict[str, Any]:
+    """Apply the SQL projection and truncation to an archived message."""
+    projected = {f: message[f] for f in fields}
+    if truncate is not None and "content" in projected:
+        projected["content_length"] = len(message["content"])
+        projected["content"] = message["content"][:truncate]
+    return projected
 
 class ChatService:
     def __init__(self, session: AsyncSession):
@@ -11,60 +42,137 @@ class ChatService:
     @property
     def gemini_service(self):
         if not self._gemini_service:
-            from app.modules.gemini.service import GeminiService
-            self._gemini_service = GeminiService()
+            from app.modules.gemini.service import get_gemini_service
+            self._gemini_service = get_gemini_service()
         return self._gemini_service
 
     async def get_reply(self, message: str) -> str:
         """Generate a reply using the Gemini AI service and store the conversation."""
         # Store user message
-        user_msg = Message(role="user", content=message)
+        user_msg = Message(user_id=current_user_id(), role="user", content=message)
         self.session.add(user_msg)
         await self.session.commit()
         await self.session.refresh(user_msg)
+        await changes.publish(MESSAGES, "created", {"id": user_msg.id, "role": user_msg.role})
 
-        # Generate reply
-        reply_content = await self.gemini_service.generate_content(message)
+        # Generate reply, skipping the agent for structured logging commands
+        extra = None
+        started = time.perf_counter()
+        handled = await fastpath.handle(self.session, message) if settings.FASTPATH_ENABLED else None
+        if handled:
+            reply_content = handled.reply
+            extra = {"fastpath": handled.intent}
+            elapsed = time.perf_counter() - started
+            metrics.incr("fastpath.hit")
+            metrics.observe("fastpath.latency", elapsed)
+            metrics.incr("fastpath.latency_saved_seconds", max(0.0, metrics.mean("agent.latency") - elapsed))
+        else:
+            metrics.incr("fastpath.miss")
+            reply_content = await self.gemini_service.generate_content(message)
+            metrics.observe("agent.latency", time.perf_counter() - started)
 
         # Store assistant message
-        assistant_msg = Message(role="assistant", content=reply_content)
+        assistant_msg = Message(user_id=current_user_id(), role="assistant", content=reply_content, extra=extra)
         self.session.add(assistant_msg)
         await self.session.commit()
         await self.session.refresh(assistant_msg)
+        await changes.publish(MESSAGES, "created", {"id": assistant_msg.id, "role": assistant_msg.role})
 
         return reply_content
 
-    async def get_messages(self, skip: int = 0, limit: int = 20) -> Tuple[List[Message], int]:
-        """Retrieve messages with pagination."""
+    @query_budget(statements=5)
+    async def get_messages(
+        self,
+        skip: int = 0,
+        limit: int = 20,
+        fields: Optional[Sequence[str]] = None,
+        truncate: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Retrieve messages with pagination, as plain row dicts, continuing into the archive."""
         
-        query = select(Message).order_by(desc(Message.created_at)).offset(skip).limit(limit)
+        user_id = current_user_id()
+        fields = list(fields or MESSAGE_FIELDS)
+        columns = []
+        for name in fields:
+            if name == "content" and truncate is not None:
+                columns.append(func.substr(Message.content, 1, truncate).label("content"))
+                columns.append(func.length(Message.content).label("content_length"))
+            else:
+                columns.append(MESSAGE_FIELDS[name])
+        query = (
+            select(*columns)
+            .where(Message.user_id == user_id)
+            .order_by(desc(Message.created_at))
+            .offset(skip)
+            .limit(limit)
+        )
         result = await self.session.execute(query)
-        messages = result.scalars().all()
+        messages = [dict(row) for row in result.mappings()]
 
-        from sqlalchemy import func
-        count_query = select(func.count()).select_from(Message)
+        count_query = select(func.count()).select_from(Message).where(Message.user_id == user_id)
         count_result = await self.session.execute(count_query)
-        total_count = count_result.scalar()
+        hot_count = count_result.scalar()
+        total_count = hot_count + await archived_count(self.session, user_id)
+
+        if len(messages) < limit and skip + len(messages) < total_count:
+            archived = await archived_page(
+                self.session, user_id, max(0, skip - hot_count), limit - len(messages)
+            )
+            messages += [_project(m, fields, truncate) for m in archived]
 
-        from app.core.pagination import pagination_helper
-        
         page = (skip // limit) + 1
         pagination_result = pagination_helper(messages, page, limit, total_count)
 
         return messages, pagination_result
 
+    @query_budget(statements=2)
+    async def get_history_version(self) -> str:
+        """Changes whenever a message is added or archived; messages are never edited."""
+        user_id = current_user_id()
+        result = await self.session.execute(
+            select(func.count(), func.max(Message.id)).select_from(Message).where(Message.user_id == user_id)
+        )
+        count, newest = result.one()
+        return f"{count}:{newest}:{await archived_count(self.session, user_id)}"
+
 # --- CRUD Functions ---
+from datetime import date
 from typing import Optional
 
+@query_budget(statements=2, commits=1)
 async def save_message(db: AsyncSession, role: str, content: str, extra: Optional[dict] = None) -> Message:
-    message = Message(role=role, content=content, extra=extra)
+    message = Message(user_id=current_user_id(), role=role, content=content, extra=extra)
     db.add(message)
     await db.commit()
     await db.refresh(message)
+    await changes.publish(MESSAGES, "created", {"id": message.id, "role": message.role})
     return message
 
+@query_budget(statements=3)
 async def get_last_messages(db: AsyncSession, limit: int = 20) -> List[Message]:
-    statement = select(Message).order_by(Message.created_at.desc()).limit(limit)
+    user_id = current_user_id()
+    statement = (
+        select(Message)
+        .where(Message.user_id == user_id)
+        .order_by(Message.created_at.desc())
+        .limit(limit)
+    )
     result = await db.exec(statement)
-    messages = result.all()
+    messages = list(result.all())
+    if len(messages) < limit:
+        # Quiet for longer than the retention window: continue into the archive
+        archived = await archived_page(db, user_id, 0, limit - len(messages))
+        messages += [Message(user_id=user_id, **m) for m in archived]
     return list(reversed(messages))  # Return in chronological order
+
+@query_budget(statements=1)
+async def get_message_digests(
+    db: AsyncSession, start: Optional[date], end: date, limit: Optional[int] = None
+) -> List[MessageDigest]:
+    """Per-day digests of archived messages between ``start`` and ``end`` (the newest ``limit``), oldest first."""
+    statement = select(MessageDigest).where(MessageDigest.user_id == current_user_id(), MessageDigest.day <= end)
+    if start is not None:
+        statement = statement.where(MessageDigest.day >= start)
+    statement = statement.order_by(MessageDigest.day.desc()).limit(limit)
+    result = await db.exec(statement)
+    return list(reversed(result.all()))
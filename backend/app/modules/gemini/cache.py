@@ -0,0 +1,192 @@
+import asyncio
+import functools
+import logging
+import weakref
+from collections import OrderedDict
+from contextlib import AsyncExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.core.cache import versions
+from app.core.metrics import metrics
+from app.core.users import current_user_id
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TurnStats:
+    turn: int
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class _Entry:
+    value: Any
+    user_id: int
+    resources: Tuple[str, ...]
+    snapshot: Tuple[int, ...]
+    turn: Optional[int] = field(default=None)
+
+
+_current_turn: ContextVar[Optional[TurnStats]] = ContextVar("tool_cache_turn", default=None)
+
+
+class ToolCache:
+    """Memoizes read tools per user until their resources change, and serializes writes per user and resource."""
+
+    # Tools report failures as strings starting with this prefix; never cache them.
+    ERROR_PREFIX = "Error"
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        # Weak values: a lock lives only while a writer holds or awaits it, so idle users cost nothing.
+        self._locks: "weakref.WeakValueDictionary[Tuple[int, str], asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._turns = 0
+
+    def reads(self, *resources: str):
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                user_id = current_user_id()
+                key = (user_id, func.__name__, date.today(), args, tuple(sorted(kwargs.items())))
+                snapshot = tuple(versions.version(r) for r in resources)
+                stats = _current_turn.get()
+
+                entry = self._entries.get(key)
+                # Versions only see other workers' writes through a live shared
+                # change feed; without one an entry is only good for its own turn.
+                reusable = entry is not None and (versions.shared or (stats and entry.turn == stats.turn))
+                if reusable and entry.snapshot == snapshot:
+                    self._entries.move_to_end(key)
+                    scope = "turn" if stats and entry.turn == stats.turn else "cross_turn"
+                    metrics.incr(f"tool_cache.{func.__name__}.hit")
+                    metrics.incr(f"tool_cache.{func.__name__}.hit.{scope}")
+                    if stats:
+                        stats.hits += 1
+                    return entry.value
+
+                inflight = self._inflight.get(key)
+                if inflight is not None:
+                    try:
+                        value = await asyncio.shield(inflight)
+                    except asyncio.CancelledError:
+                        # Only our own cancellation propagates; if the shared
+                        # run was cancelled, run the tool ourselves below.
+                        if not inflight.cancelled():
+                            raise
+                    else:
+                        metrics.incr(f"tool_cache.{func.__name__}.hit")
+                        metrics.incr(f"tool_cache.{func.__name__}.hit.inflight")
+                        if stats:
+                            stats.hits += 1
+                        return value
+
+                metrics.incr(f"tool_cache.{func.__name__}.miss")
+                if stats:
+                    stats.misses += 1
+                future = asyncio.get_running_loop().create_future()
+                self._inflight[key] = future
+                try:
+                    value = await func(*args, **kwargs)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    future.set_exception(e)
+                    # Nobody may be waiting on it; don't warn about an unretrieved exception
+                    future.exception()
+                    raise
+                else:
+                    future.set_result(value)
+                finally:
+                    self._inflight.pop(key, None)
+
+                if not (isinstance(value, str) and value.startswith(self.ERROR_PREFIX)):
+                    self._store(key, _Entry(value, user_id, resources, snapshot, stats.turn if stats else None))
+                return value
+
+            wrapper.tool_access = "read"
+            wrapper.cache_resources = resources
+            return wrapper
+
+        return decorator
+
+    def writes(self, *resources: str):
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                async with AsyncExitStack() as stack:
+                    # Sorted acquisition keeps multi-resource writers deadlock-free.
+                    for resource in sorted(resources):
+                        await stack.enter_async_context(self._lock(resource))
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        # Invalidate even on failure: part of the write may have committed.
+                        self.invalidate(*resources)
+
+            wrapper.tool_access = "write"
+            wrapper.cache_resources = resources
+            return wrapper
+
+        return decorator
+
+    def invalidate(self, *resources: str, user_id: Optional[int] = None) -> int:
+        user_id = current_user_id() if user_id is None else user_id
+        stale = [
+            k for k, e in self._entries.items()
+            if e.user_id == user_id and set(e.resources) & set(resources)
+        ]
+        for key in stale:
+            del self._entries[key]
+        stats = _current_turn.get()
+        if stats:
+            stats.invalidations += len(stale)
+        metrics.incr("tool_cache.invalidations", len(stale))
+        return len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _lock(self, resource: str) -> asyncio.Lock:
+        key = (current_user_id(), resource)
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    @contextmanager
+    def turn(self) -> Iterator[TurnStats]:
+        """Scope one agent run so hits can be attributed to it."""
+        self._turns += 1
+        stats = TurnStats(turn=self._turns)
+        token = _current_turn.set(stats)
+        try:
+            yield stats
+        finally:
+            _current_turn.reset(token)
+            logger.info(
+                "Tool cache turn %d: %d hits, %d misses (%.0f%% hit rate), %d invalidated",
+                stats.turn, stats.hits, stats.misses, stats.hit_rate * 100, stats.invalidations,
+            )
+
+    def _store(self, key: Tuple, entry: _Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+tool_cache = ToolCache()
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Loaded as the static system prompt, never retrieved.
+SYSTEM_PROMPT_FILE = "SYSTEM_PROMPT.md"
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "for", "from", "how", "i",
+    "in", "is", "it", "me", "my", "of", "on", "or", "so", "that", "the", "this", "to",
+    "was", "what", "with", "you", "your",
+}
+
+HEADING = re.compile(r"^#{1,6}\s+(.*)$", re.MULTILINE)
+WORD = re.compile(r"[a-z0-9]+")
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+@dataclass
+class Chunk:
+    source: str
+    heading: str
+    text: str
+    terms: Counter
+    length: int
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+    def render(self) -> str:
+        title = f"{self.source} › {self.heading}" if self.heading else self.source
+        return f"[{title}]\n{self.text}"
+
+
+def chunk_markdown(source: str, content: str, max_chars: int) -> List[Chunk]:
+    """Split a markdown file by heading, then by paragraph to stay under ``max_chars``."""
+    starts = [(m.start(), m.end(), m.group(1).strip()) for m in HEADING.finditer(content)]
+    if not starts or starts[0][0] > 0:
+        starts.insert(0, (0, 0, ""))
+
+    chunks = []
+    for i, (_, body_start, heading) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(content)
+        body = content[body_start:end].strip()
+        if not body:
+            continue
+
+        pieces, buffer = [], ""
+        for paragraph in re.split(r"\n\s*\n", body):
+            if buffer and len(buffer) + len(paragraph) > max_chars:
+                pieces.append(buffer)
+                buffer = ""
+            buffer = f"{buffer}\n\n{paragraph}" if buffer else paragraph
+        if buffer:
+            pieces.append(buffer)
+
+        for text in pieces:
+            terms = Counter(tokenize(f"{heading} {text}"))
+            chunks.append(Chunk(source, heading, text, terms, sum(terms.values())))
+    return chunks
+
+
+class KnowledgeIndex:
+    """BM25 index over the knowledge directory's markdown, re-chunking only files that changed."""
+
+    def __init__(self, directory: str, chunk_chars: int = 1200, min_interval: float = 30.0):
+        self.directory = directory
+        self.chunk_chars = chunk_chars
+        self.min_interval = min_interval
+        self._checked_at = float("-inf")
+        self._files: Dict[str, Tuple[Tuple[int, int], List[Chunk]]] = {}
+        self._chunks: List[Chunk] = []
+        self._df: Counter = Counter()
+        self._avg_length = 0.0
+
+    def refresh(self) -> bool:
+        """Re-index changed files; returns whether anything changed."""
+        try:
+            entries = {
+                e.name: (e.stat().st_mtime_ns, e.stat().st_size)
+                for e in os.scandir(self.directory)
+                if e.is_file() and e.name.endswith(".md") and e.name != SYSTEM_PROMPT_FILE
+            }
+        except FileNotFoundError:
+            entries = {}
+
+        changed = False
+        for name in list(self._files):
+            if name not in entries:
+                del self._files[name]
+                changed = True
+        for name, stamp in entries.items():
+            if name in self._files and self._files[name][0] == stamp:
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "r") as f:
+                    content = f.read()
+            except OSError as e:
+                logger.warning("Error reading knowledge file %s: %s", name, e)
+                continue
+            self._files[name] = (stamp, chunk_markdown(name, content, self.chunk_chars))
+            changed = True
+
+        if changed:
+            chunks = [c for _, entry in sorted(self._files.items()) for c in entry[1]]
+            df = Counter(term for c in chunks for term in c.terms)
+            avg_length = sum(c.length for c in chunks) / len(chunks) if chunks else 0.0
+            # Swap in together, since searches may run while this is in a thread
+            self._chunks, self._df, self._avg_length = chunks, df, avg_length
+            logger.info("Knowledge index: %d chunks from %d files", len(chunks), len(self._files))
+        return changed
+
+    async def refresh_if_stale(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.min_interval:
+            return
+        self._checked_at = now
+        await asyncio.to_thread(self.refresh)
+
+    def search(self, query: str, top_k: int, token_budget: int) -> List[Chunk]:
+        """Best ``top_k`` chunks for ``query`` that fit in ``token_budget`` tokens."""
+        terms = set(tokenize(query))
+        if not terms or not self._chunks:
+            return []
+
+        n = len(self._chunks)
+        scored = []
+        for chunk in self._chunks:
+            score = 0.0
+            for term in terms:
+                tf = chunk.terms.get(term)
+                if not tf:
+                    continue
+                idf = math.log(1 + (n - self._df[term] + 0.5) / (self._df[term] + 0.5))
+                norm = K1 * (1 - B + B * chunk.length / (self._avg_length or 1))
+                score += idf * tf * (K1 + 1) / (tf + norm)
+            if score > 0:
+                scored.append((score, chunk))
+        scored.sort(key=lambda s: s[0], reverse=True)
+
+        selected, used = [], 0
+        for _, chunk in scored[:top_k]:
+            if used + chunk.tokens > token_budget:
+                continue
+            selected.append(chunk)
+            used += chunk.tokens
+        return selected
+
+    async def context_for(self, query: str) -> str:
+        """Prompt section with the knowledge relevant to ``query``, or ``""``."""
+        await self.refresh_if_stale()
+        chunks = self.search(query, settings.KNOWLEDGE_TOP_K, settings.KNOWLEDGE_TOKEN_BUDGET)
+        if not chunks:
+            return ""
+        return "\n\n--- Relevant knowledge ---\n" + "\n\n".join(c.render() for c in chunks)
+
+
+knowledge_index = KnowledgeIndex(
+    os.path.join(os.getcwd(), "knowledge"),
+    chunk_chars=settings.KNOWLEDGE_CHUNK_CHARS,
+    min_interval=settings.KNOWLEDGE_REFRESH_SECONDS,
+)
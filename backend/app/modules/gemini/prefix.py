@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.tools import BaseTool
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PromptPrefix:
+    """The static part of every request: system prompt and tool schemas."""
+
+    text: str
+    digest: str
+    fingerprint: Tuple[Tuple[str, int, int], ...]
+
+
+def tool_schemas(tools: Sequence[BaseTool]) -> List[Dict]:
+    return [
+        {
+            "name": t.name,
+            "description": t.description,
+            "parameters": t.tool_call_schema.model_json_schema(),
+        }
+        for t in tools
+    ]
+
+
+class PrefixCache:
+    """Builds the static prompt prefix once and rebuilds it only when its files change."""
+
+    def __init__(
+        self, paths: Sequence[str], build: Callable[[], str], tools: Sequence[BaseTool], min_interval: float = 0.0
+    ):
+        self.paths = list(paths)
+        self._build = build
+        self._tools_json = json.dumps(tool_schemas(tools), sort_keys=True)
+        self.min_interval = min_interval
+        self._checked_at = float("-inf")
+        self._prefix: Optional[PromptPrefix] = None
+
+    def _fingerprint(self) -> Tuple[Tuple[str, int, int], ...]:
+        stamps = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                stamps.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamps.append((path, 0, -1))
+        return tuple(stamps)
+
+    def get(self) -> PromptPrefix:
+        now = time.monotonic()
+        if self._prefix is not None and now - self._checked_at < self.min_interval:
+            return self._prefix
+        self._checked_at = now
+        fingerprint = self._fingerprint()
+        if self._prefix is None or self._prefix.fingerprint != fingerprint:
+            text = self._build()
+            digest = hashlib.sha256((text + self._tools_json).encode()).hexdigest()
+            if self._prefix is not None:
+                logger.info("System prompt changed, rebuilt prompt prefix %s", digest[:12])
+            self._prefix = PromptPrefix(text=text, digest=digest, fingerprint=fingerprint)
+        return self._prefix
+
+
+class ProviderContextCache:
+    """One Gemini context cache per (model, prefix digest), recreated shortly before its TTL runs out."""
+
+    # Recreate this many seconds before the provider expires the cache.
+    REFRESH_MARGIN = 60
+    # After a failed create, send the prefix inline and retry after this long, doubling up to the max.
+    RETRY_SECONDS = 30.0
+    RETRY_MAX_SECONDS = 3600.0
+
+    def __init__(self, api_key: str, ttl_seconds: int):
+        self.api_key = api_key
+        self.ttl_seconds = ttl_seconds
+        self._client = None
+        self._entries: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        # One create at a time per key: concurrent first turns share it instead of each paying for a cache
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        # Keys whose create call failed (too small, SDK missing, quota) -> (retry after, current backoff)
+        self._retry: Dict[Tuple[str, str], Tuple[float, float]] = {}
+
+    def _get_client(self):
+        if self._client is None:
+            from google import genai
+
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    def _fresh(self, key: Tuple[str, str]) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry and entry[1] - self.REFRESH_MARGIN > time.time():
+            return entry[0]
+        return None
+
+    async def name_for(self, model: str, prefix: PromptPrefix, tools: Sequence[BaseTool]) -> Optional[str]:
+        key = (model, prefix.digest)
+        name = self._fresh(key)
+        if name is not None:
+            return name
+        retry = self._retry.get(key)
+        if retry and retry[0] > time.monotonic():
+            return None
+
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            # Someone else may have created it (or failed) while we waited.
+            name = self._fresh(key)
+            if name is not None:
+                return name
+            retry = self._retry.get(key)
+            if retry and retry[0] > time.monotonic():
+                return None
+            return await self._create(key, prefix, tools)
+
+    async def _create(self, key: Tuple[str, str], prefix: PromptPrefix, tools: Sequence[BaseTool]) -> Optional[str]:
+        model = key[0]
+        try:
+            from google.genai import types
+
+            client = self._get_client()
+            cache = await client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"lifeos-prefix-{prefix.digest[:12]}",
+                    system_instruction=prefix.text,
+                    tools=[types.Tool(function_declarations=[
+                        types.FunctionDeclaration(
+                            name=schema["name"],
+                            description=schema["description"],
+                            parameters_json_schema=schema["parameters"],
+                        )
+                        for schema in tool_schemas(tools)
+                    ])],
+                    ttl=f"{self.ttl_seconds}s",
+                ),
+            )
+        except Exception as e:
+            previous = self._retry.get(key)
+            backoff = min(previous[1] * 2, self.RETRY_MAX_SECONDS) if previous else self.RETRY_SECONDS
+            self._retry[key] = (time.monotonic() + backoff, backoff)
+            logger.warning(
+                "Context cache unavailable for %s, using inline prefix, retrying in %.0fs: %s", model, backoff, e
+            )
+            return None
+        self._retry.pop(key, None)
+
+        # Drop the cache this one replaces (same prefix near its TTL) and those built from an older prefix.
+        for old_key in [k for k in self._entries if k[0] == model]:
+            old_name, _ = self._entries.pop(old_key)
+            if old_key != key:
+                self._locks.pop(old_key, None)
+            try:
+                await self._get_client().aio.caches.delete(name=old_name)
+            except Exception as e:
+                logger.warning("Could not delete context cache %s: %s", old_name, e)
+
+        self._entries[key] = (cache.name, time.time() + self.ttl_seconds)
+        logger.info("Created context cache %s for prefix %s", cache.name, prefix.digest[:12])
+        return cache.name
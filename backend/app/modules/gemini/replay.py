@@ -0,0 +1,76 @@
+import asyncio
+import gzip
+import logging
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import orjson
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.core.log import request_id_var
+
+logger = logging.getLogger(__name__)
+
+# Reply used when a replayed turn asks for more steps than were recorded.
+MISSING_STEP_REPLY = "(no recorded response for this step)"
+
+
+def read_capture(path: str) -> List[Dict[str, Any]]:
+    """Records from a capture file written by ``CaptureMiddleware``."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return [orjson.loads(line) for line in f if line.strip()]
+
+
+class ReplayChatModel(BaseChatModel):
+    """Stand-in chat model serving the recorded LLM steps of the current request ID."""
+
+    transcripts: Dict[str, List[Dict[str, Any]]]
+    speed: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ReplayChatModel":
+        return self
+
+    def _step(self, messages: List[BaseMessage]) -> Dict[str, Any]:
+        steps = self.transcripts.get(request_id_var.get(), [])
+        index = sum(1 for m in messages if isinstance(m, AIMessage))
+        if index >= len(steps):
+            logger.warning("No recorded LLM step %d for request %s", index, request_id_var.get())
+            return {"text": MISSING_STEP_REPLY, "tool_calls": [], "latency": 0.0}
+        return steps[index]
+
+    def _result(self, step: Dict[str, Any]) -> ChatResult:
+        tool_calls = [
+            {"name": c["name"], "args": c["args"], "id": c.get("id") or uuid.uuid4().hex}
+            for c in step["tool_calls"]
+        ]
+        message = AIMessage(content=step["text"], tool_calls=tool_calls)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _delay(self, step: Dict[str, Any]) -> float:
+        return step.get("latency", 0.0) / self.speed if self.speed > 0 else 0.0
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        step = self._step(messages)
+        time.sleep(self._delay(step))
+        return self._result(step)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        step = self._step(messages)
+        await asyncio.sleep(self._delay(step))
+        return self._result(step)
+
+
+def load_replay_factory(path: str, speed: float = 1.0) -> Callable[[str], BaseChatModel]:
+    """``GeminiService`` llm_factory serving the agent transcripts in ``path``."""
+    transcripts = {r["request_id"]: r["llm"] for r in read_capture(path) if r.get("llm")}
+    logger.info("Replaying %d recorded agent turns from %s", len(transcripts), path)
+    model = ReplayChatModel(transcripts=transcripts, speed=speed)
+    return lambda _model_name: model
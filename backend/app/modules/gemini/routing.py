@@ -0,0 +1,65 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+FAST = "fast"
+PRO = "pro"
+TIERS = (FAST, PRO)
+
+# Short replies that need no reasoning at all.
+ACKNOWLEDGEMENT = re.compile(
+    r"^(thanks|thank you|thx|ok|okay|k|cool|great|nice|awesome|got it|sure|yes|no|yep|nope|👍|🙏)[\s.!]*$"
+)
+
+# Phrases that mean the turn needs context tools or real reasoning.
+CONTEXT_HINTS = (
+    "review", "reflect", "summar", "how was", "how am i", "progress", "week",
+    "month", "yesterday", "why", "should i", "advice", "goal", "plan", "analy",
+    "compare", "trend", "help me",
+)
+
+# Words that, next to a known habit, mark a plain logging message.
+LOGGING_HINTS = re.compile(r"\b(done|did|skipped|missed|logged|completed|slept|drank)\b|\d")
+
+
+@dataclass(frozen=True)
+class Route:
+    tier: str
+    reason: str
+
+
+def classify_turn(message: str, known_habits: Iterable[str] = (), fast_max_chars: int = 160) -> Route:
+    """Pick a model tier from cheap features of the message."""
+    text = message.strip().lower()
+    if not text or ACKNOWLEDGEMENT.match(text):
+        return Route(FAST, "acknowledgement")
+    if len(text) > fast_max_chars:
+        return Route(PRO, "long_message")
+    if any(hint in text for hint in CONTEXT_HINTS):
+        return Route(PRO, "needs_context")
+    if "?" in text:
+        return Route(PRO, "question")
+    # A known habit alone isn't enough ("I could not sleep"): it must come with a status or amount.
+    if LOGGING_HINTS.search(text) and any(
+        re.search(rf"\b{re.escape(h.lower())}\b", text) for h in known_habits
+    ):
+        return Route(FAST, "logging")
+    return Route(PRO, "unclassified")
+
+
+class TurnRouter:
+    """Maps a turn to a configured model, honouring a global or per-call override."""
+
+    def __init__(self, models: Dict[str, str], override: str = "", fast_max_chars: int = 160):
+        self.models = models
+        self.override = override if override in TIERS else ""
+        self.fast_max_chars = fast_max_chars
+
+    def route(self, message: str, known_habits: Iterable[str] = (), override: Optional[str] = None) -> Route:
+        forced = override if override in TIERS else self.override
+        if forced:
+            return Route(forced, "override")
+        return classify_turn(message, known_habits, self.fast_max_chars)
+
+    def model_for(self, route: Route) -> str:
+        return self.models[route.tier]
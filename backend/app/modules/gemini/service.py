@@ -1,106 +1,257 @@
+import asyncio
+import logging
 import os
+import time
 from datetime import date
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
 
 from fastapi import HTTPException, status
 from langchain_classic.agents import AgentExecutor, create_tool_calling_agent
+from langchain_classic.agents.format_scratchpad.tools import format_to_tool_messages
+from langchain_classic.agents.output_parsers.tools import ToolsAgentOutputParser
+from langchain_core.callbacks import BaseCallbackHandler, UsageMetadataCallbackHandler
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnablePassthrough
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage
 
 from app.core.config import settings
+from app.core.deadline import deadline, remaining
+from app.core.metrics import metrics
+from app.modules.gemini.cache import tool_cache
+from app.modules.chat.fastpath import fastpath
+from app.modules.gemini.knowledge import SYSTEM_PROMPT_FILE, estimate_tokens, knowledge_index
+from app.modules.gemini.prefix import PrefixCache, PromptPrefix, ProviderContextCache
+from app.modules.gemini.routing import FAST, PRO, Route, TurnRouter
+from app.modules.gemini.replay import load_replay_factory
+from app.modules.gemini.tracing import capture_handlers, sampled_trace_handlers
 
 from .tools import (
     save_habits, save_journal, get_context, save_tomorrow_plan, get_habits
 )
 
-class GeminiService:
+logger = logging.getLogger(__name__)
+
+# Output AgentExecutor produces when it hits max_iterations / max_execution_time
+AGENT_STOPPED_PREFIX = "Agent stopped due to"
+
+
+class ToolStepRecorder(BaseCallbackHandler):
+    """Collects finished tool calls so a turn cut short can still report them."""
+
+    run_inline = True
+
     def __init__(self):
+        self._running: Dict[UUID, str] = {}
+        self.completed: List[Tuple[str, str]] = []
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._running[run_id] = (serialized or {}).get("name") or kwargs.get("name", "tool")
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        name = self._running.pop(run_id, kwargs.get("name", "tool"))
+        self.completed.append((name, str(getattr(output, "content", output))))
+
+
+class GeminiService:
+    def __init__(self, llm_factory: Optional[Callable[[str], BaseChatModel]] = None):
+        """
+        ``llm_factory`` builds the chat model for a model name; pass a stub
+        to run the agent and router offline.
+        """
         api_key = settings.GEMINI_API_KEY
-        if not api_key:
+        if llm_factory is None and not api_key:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="GEMINI_API_KEY not configured in environment variables",
             )
 
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro",
-            google_api_key=api_key,
-            temperature=0.7,
+        self.llm_factory = llm_factory or (
+            lambda model: ChatGoogleGenerativeAI(
+                model=model,
+                google_api_key=api_key,
+                temperature=0.7,
+            )
+        )
+        self.router = TurnRouter(
+            {FAST: settings.GEMINI_FAST_MODEL, PRO: settings.GEMINI_PRO_MODEL},
+            override=settings.GEMINI_ROUTE_OVERRIDE,
+            fast_max_chars=settings.GEMINI_FAST_MAX_CHARS,
         )
         
         self.tools = [
             save_habits, save_journal, get_context, save_tomorrow_plan, get_habits
         ]
         
-        # Define the prompt template
+        # Define the prompt template: static system prompt first, so the
+        # prefix stays cacheable, then the knowledge retrieved for this turn
         self.prompt = ChatPromptTemplate.from_messages([
-            ("system", "{system_message}"),
+            ("system", "{system_message}{knowledge}"),
             ("human", "{input}"),
             MessagesPlaceholder("agent_scratchpad"),
         ])
-        
-        # Create the agent
-        self.agent = create_tool_calling_agent(self.llm, self.tools, self.prompt)
-        
-        # Create the executor
-        self.agent_executor = AgentExecutor(
-            agent=self.agent, 
-            tools=self.tools, 
-            verbose=True,
-            handle_parsing_errors=True
+
+        # Models and executors are built on first use, one per routed model
+        self._llms: Dict[str, BaseChatModel] = {}
+        self._executors: Dict[str, AgentExecutor] = {}
+
+        # Static prompt prefix, rebuilt only when the system prompt changes.
+        # Knowledge files are retrieved per turn instead (see knowledge.py).
+        self.prefix_cache = PrefixCache(
+            [os.path.join(os.getcwd(), "knowledge", SYSTEM_PROMPT_FILE)],
+            self._load_system_prompt,
+            self.tools,
+            min_interval=settings.KNOWLEDGE_REFRESH_SECONDS,
+        )
+        self.context_cache = (
+            ProviderContextCache(api_key, settings.GEMINI_CONTEXT_CACHE_TTL)
+            if settings.GEMINI_CONTEXT_CACHE else None
         )
+        self._cached_executors: Dict[Tuple[str, str], AgentExecutor] = {}
+
+    def _llm(self, model: str) -> BaseChatModel:
+        if model not in self._llms:
+            self._llms[model] = self.llm_factory(model)
+        return self._llms[model]
 
-    def _load_knowledge(self) -> str:
-        """Load content from specific knowledge files."""
-        knowledge_dir = os.path.join(os.getcwd(), "knowledge")
-        files_to_read = [
-            "GOAL.md",
-            "DAILY_REVIEW_TEMPLATE.md",
-            "CORE_PRINCIPLES_PROTOCOL.md",
-            "IDENTITY.md"
+    def _executor(self, model: str) -> AgentExecutor:
+        if model not in self._executors:
+            agent = create_tool_calling_agent(self._llm(model), self.tools, self.prompt)
+            self._executors[model] = AgentExecutor(
+                agent=agent, 
+                tools=self.tools, 
+                verbose=False,
+                handle_parsing_errors=True,
+                max_iterations=settings.AGENT_MAX_ITERATIONS,
+                max_execution_time=settings.AGENT_TURN_TIMEOUT,
+            )
+        return self._executors[model]
+
+    def _cached_executor(self, model: str, cache_name: str) -> AgentExecutor:
+        """Executor for a provider context cache, which already holds the system prompt and tools."""
+        key = (model, cache_name)
+        if key not in self._cached_executors:
+            # Gemini rejects requests resending what the cache holds: no system message, no bind_tools
+            prompt = ChatPromptTemplate.from_messages([
+                ("human", "{input}{knowledge}"),
+                MessagesPlaceholder("agent_scratchpad"),
+            ])
+            agent = (
+                RunnablePassthrough.assign(
+                    agent_scratchpad=lambda x: format_to_tool_messages(x["intermediate_steps"]),
+                )
+                | prompt
+                | self._llm(model).bind(cached_content=cache_name)
+                | ToolsAgentOutputParser()
+            )
+            # Only the executor for each model's live cache is worth keeping
+            self._cached_executors = {k: v for k, v in self._cached_executors.items() if k[0] != model}
+            self._cached_executors[key] = AgentExecutor(
+                agent=agent,
+                tools=self.tools,
+                verbose=False,
+                handle_parsing_errors=True,
+                max_iterations=settings.AGENT_MAX_ITERATIONS,
+                max_execution_time=settings.AGENT_TURN_TIMEOUT,
+            )
+        return self._cached_executors[key]
+
+    def _log_usage(
+        self,
+        usage: UsageMetadataCallbackHandler,
+        prefix: PromptPrefix,
+        cache_name: Optional[str],
+        route: Route,
+        model: str,
+        elapsed: float,
+    ):
+        """Record latency, token counts and how much of the prompt the provider served from cache."""
+        prompt_tokens = sum(u.get("input_tokens", 0) for u in usage.usage_metadata.values())
+        output_tokens = sum(u.get("output_tokens", 0) for u in usage.usage_metadata.values())
+        cached_tokens = sum(
+            (u.get("input_token_details") or {}).get("cache_read", 0)
+            for u in usage.usage_metadata.values()
+        )
+        metrics.incr("llm.turns")
+        metrics.incr("llm.prompt_tokens", prompt_tokens)
+        metrics.incr("llm.cached_prompt_tokens", cached_tokens)
+        # Token counts per route are the cost signal for the router
+        metrics.incr(f"llm.route.{route.tier}.turns")
+        metrics.incr(f"llm.route.{route.tier}.reason.{route.reason}")
+        metrics.incr(f"llm.route.{route.tier}.prompt_tokens", prompt_tokens)
+        metrics.incr(f"llm.route.{route.tier}.output_tokens", output_tokens)
+        metrics.observe(f"llm.route.{route.tier}.latency", elapsed)
+        logger.info(
+            "LLM turn: route=%s (%s) model=%s %.2fs prefix=%s context_cache=%s "
+            "prompt_tokens=%d cached_tokens=%d (%.0f%% cache hit) output_tokens=%d",
+            route.tier, route.reason, model, elapsed, prefix.digest[:12], cache_name or "inline",
+            prompt_tokens, cached_tokens,
+            100 * cached_tokens / prompt_tokens if prompt_tokens else 0,
+            output_tokens,
+        )
+
+    def _partial_reply(self, steps: ToolStepRecorder, reason: str) -> str:
+        """Reply for a turn cut short: say so, and list the writes that did go through."""
+        access = {t.name: getattr(t.coroutine, "tool_access", "read") for t in self.tools}
+        done = [
+            output for name, output in steps.completed
+            if access.get(name) == "write" and not output.startswith(tool_cache.ERROR_PREFIX)
         ]
-        
-        knowledge_content = []
-        for filename in files_to_read:
-            file_path = os.path.join(knowledge_dir, filename)
-            if os.path.exists(file_path):
-                try:
-                    with open(file_path, "r") as f:
-                        content = f.read()
-                        knowledge_content.append(f"--- {filename} ---\n{content}\n")
-                except Exception as e:
-                    print(f"Error reading knowledge file {filename}: {e}")
-        
-        if not knowledge_content:
-            return ""
-            
-        return "\n\n" + "\n".join(knowledge_content)
+        lines = [f"I had to stop before finishing ({reason})."]
+        if done:
+            lines.append("Completed so far:")
+            lines.extend(f"- {output}" for output in done)
+        else:
+            lines.append("Nothing was saved; please try again.")
+        return "\n".join(lines)
 
     def _load_system_prompt(self) -> str:
         """Load the base system prompt from SYSTEM_PROMPT.md."""
-        prompt_path = os.path.join(os.getcwd(), "knowledge", "SYSTEM_PROMPT.md")
+        prompt_path = os.path.join(os.getcwd(), "knowledge", SYSTEM_PROMPT_FILE)
         if os.path.exists(prompt_path):
             try:
                 with open(prompt_path, "r") as f:
                     return f.read().strip()
             except Exception as e:
-                print(f"Error reading SYSTEM_PROMPT.md: {e}")
+                logger.warning("Error reading %s: %s", SYSTEM_PROMPT_FILE, e)
         
         # Fallback if file doesn't exist
         return "You are a helpful assistant."
 
-    async def generate_content(self, prompt: str) -> str:
-        """
-        Process a message using the LangChain agent with tools.
-        """
+    async def warm(self) -> None:
+        """Do the first turn's setup ahead of time: prompt prefix, knowledge index, executors and context caches."""
+        prefix = self.prefix_cache.get()
+        await asyncio.to_thread(knowledge_index.refresh)
+        for model in set(self.router.models.values()):
+            self._executor(model)
+            if self.context_cache is not None:
+                cache_name = await self.context_cache.name_for(model, prefix, self.tools)
+                if cache_name:
+                    self._cached_executor(model, cache_name)
 
-        knowledge_context = self._load_knowledge()
-        base_prompt = self._load_system_prompt()
-        
-        system_prompt = (
-            f"{base_prompt}\n\n"
-            f"{knowledge_context}"
-        )
+    async def generate_content(self, prompt: str, tier: Optional[str] = None) -> str:
+        """Process a message using the LangChain agent with tools, on the model ``tier`` or the routed one."""
+
+        route = self.router.route(prompt, fastpath.names.cached(), override=tier)
+        model = self.router.model_for(route)
+
+        prefix = self.prefix_cache.get()
+        system_prompt = prefix.text
+        knowledge = await knowledge_index.context_for(prompt)
+        metrics.observe("knowledge.tokens", estimate_tokens(knowledge) if knowledge else 0)
+
+        executor = self._executor(model)
+        cache_name = None
+        if self.context_cache is not None:
+            cache_name = await self.context_cache.name_for(model, prefix, self.tools)
+            if cache_name:
+                executor = self._cached_executor(model, cache_name)
+        usage = UsageMetadataCallbackHandler()
+        steps = ToolStepRecorder()
+        started = time.perf_counter()
 
         messages = [
             SystemMessage(content=system_prompt),
@@ -108,14 +259,34 @@ class GeminiService:
         ]
         
         try:
-            # Execute agent
-            result = await self.agent_executor.ainvoke({
-                "system_message": system_prompt,
-                "input": prompt
-            })
-            
+            # Execute agent within the turn budget; tools inherit the deadline
+            with deadline(settings.AGENT_TURN_TIMEOUT), tool_cache.turn():
+                try:
+                    result = await asyncio.wait_for(
+                        executor.ainvoke(
+                            {
+                                "system_message": system_prompt,
+                                "knowledge": knowledge,
+                                "input": prompt
+                            },
+                            config={"callbacks": [usage, steps, *sampled_trace_handlers(), *capture_handlers()]},
+                        ),
+                        remaining(),
+                    )
+                except asyncio.TimeoutError:
+                    result = None
+            self._log_usage(usage, prefix, cache_name, route, model, time.perf_counter() - started)
+
+            if result is None:
+                metrics.incr("agent.turn_timeouts")
+                return self._partial_reply(steps, "time limit reached")
+
             final_content = result["output"]
 
+            if isinstance(final_content, str) and final_content.startswith(AGENT_STOPPED_PREFIX):
+                metrics.incr("agent.iteration_limits")
+                return self._partial_reply(steps, "too many steps")
+
             if isinstance(final_content, list):
                 parsed_parts = []
                 for part in final_content:
@@ -132,3 +303,21 @@ class GeminiService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error processing request: {str(e)}",
             )
+
+
+@lru_cache(maxsize=None)
+def get_gemini_service() -> GeminiService:
+    """Shared GeminiService, so the agent, prompt prefix and context cache survive across requests."""
+    if settings.REPLAY_CAPTURE_PATH:
+        return GeminiService(llm_factory=load_replay_factory(settings.REPLAY_CAPTURE_PATH, settings.REPLAY_SPEED))
+    return GeminiService()
+
+
+async def warm_gemini_service() -> None:
+    """Scheduled job: build the shared service and warm it before the day's first turn."""
+    try:
+        service = get_gemini_service()
+    except HTTPException as e:
+        logger.info("Skipping LLM warm-up: %s", e.detail)
+        return
+    await service.warm()
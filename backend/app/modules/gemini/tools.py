@@ -2,13 +2,27 @@ from datetime import date, timedelta
 from typing import List, Optional, Dict, Any
 from langchain_core.tools import tool
 
-from app.core.db import async_session
+from app.core.cache import MESSAGES, HABITS, JOURNAL, PLANS
+from app.core.config import settings
+from app.core.db import async_session, read_session
+from app.core.deadline import bounded
+from app.core.querybudget import query_budget
 from app.modules.chat import service as chat_service
 from app.modules.habit import service as habit_service
 from app.modules.journal import service as journal_service
 from app.modules.plan import service as plan_service
+from app.modules.review import service as review_service
+from app.modules.gemini.cache import tool_cache
+
+# Every tool declares whether it reads or writes, and which resources.
+# Calls from one agent step run concurrently: reads are memoized, writes to
+# the same resource are serialized. Each call is bounded by the per-tool
+# timeout and the remaining turn budget, and declares its SQL round trips.
 
 @tool
+@tool_cache.writes(HABITS)
+@bounded(settings.AGENT_TOOL_TIMEOUT)
+@query_budget(statements=7, commits=1)
 async def save_habits(habits: dict) -> str:
     """
     Store today's habit log.
@@ -24,10 +38,8 @@ async def save_habits(habits: dict) -> str:
     """
     try:
         async with async_session() as session:
-            today = date.today()
-            results = []
+            values = {}
             for habit_name, value in habits.items():
-                habit_id = await habit_service.get_habit_id(session, habit_name)
                 # Normalize value to dict if it's a boolean
                 if isinstance(value, bool):
                      entry_value = {"completed": value}
@@ -35,14 +47,18 @@ async def save_habits(habits: dict) -> str:
                     entry_value = value
                 else:
                     entry_value = {"value": value}
-                
-                entry = await habit_service.upsert_habit_entry(session, habit_id, today, entry_value)
-                results.append(f"Logged {habit_name}")
+                values[habit_name] = entry_value
+
+            await habit_service.upsert_habit_entries(session, date.today(), values)
+            results = [f"Logged {habit_name}" for habit_name in values]
             return f"Habits saved: {', '.join(results)}"
     except Exception as e:
         return f"Error saving habits: {str(e)}"
 
 @tool
+@tool_cache.writes(JOURNAL)
+@bounded(settings.AGENT_TOOL_TIMEOUT)
+@query_budget(statements=3, commits=1)
 async def save_journal(entry: dict) -> str:
     """
     Save today's journal.
@@ -67,19 +83,33 @@ async def save_journal(entry: dict) -> str:
         return f"Error saving journal: {str(e)}"
 
 @tool
+@tool_cache.reads(MESSAGES, HABITS, JOURNAL, PLANS)
+@bounded(settings.AGENT_TOOL_TIMEOUT)
+@query_budget(statements=9)
 async def get_context(_: str = "") -> str:
     """
     Returns:
     - last 20 messages
+    - digests of the days before them, once archived
     - today's habits
     - today's journal
     - yesterday's plan
+    - habit streaks through yesterday
     """
     try:
-        async with async_session() as session:
+        async with read_session() as session:
             # Last 20 messages
             messages = await chat_service.get_last_messages(session, limit=20)
             messages_str = "\n".join([f"{m.role}: {m.content}" for m in messages])
+
+            # Earlier days, which survive as digests once their messages are archived
+            before = (messages[0].created_at.date() if messages else date.today()) - timedelta(days=1)
+            digests = await chat_service.get_message_digests(
+                session, None, before, limit=settings.CONTEXT_DIGEST_DAYS
+            )
+            digests_str = "\n".join(
+                f"{d.day} ({d.message_count} messages):\n{d.summary}" for d in digests
+            ) or "None"
             
             # Today's habits
             habits = await habit_service.get_today_habits(session)
@@ -89,12 +119,15 @@ async def get_context(_: str = "") -> str:
             journal = await journal_service.get_today_journal(session)
             journal_str = journal.model_dump() if journal else "None"
             
-            # Yesterday's plan
-            plan = await plan_service.get_yesterday_plan(session)
-            plan_str = plan.model_dump() if plan else "None"
+            # Yesterday's plan and streaks, precomputed each morning
+            snapshot = await review_service.get_today_snapshot(session)
+            streaks_str = ", ".join(f"{name}: {days}d" for name, days in sorted(snapshot.streaks.items())) or "None"
             
             return f"""
 Context:
+--- Earlier Days (archived) ---
+{digests_str}
+
 --- Last Messages ---
 {messages_str}
 
@@ -105,12 +138,18 @@ Context:
 {journal_str}
 
 --- Yesterday's Plan ---
-{plan_str}
+{snapshot.plan_summary}
+
+--- Habit Streaks (through yesterday) ---
+{streaks_str}
 """
     except Exception as e:
         return f"Error retrieving context: {str(e)}"
 
 @tool
+@tool_cache.writes(PLANS)
+@bounded(settings.AGENT_TOOL_TIMEOUT)
+@query_budget(statements=3, commits=1)
 async def save_tomorrow_plan(data: dict) -> str:
     """
     Input:
@@ -128,12 +167,15 @@ async def save_tomorrow_plan(data: dict) -> str:
         return f"Error saving plan: {str(e)}"
 
 @tool
+@tool_cache.reads(HABITS)
+@bounded(settings.AGENT_TOOL_TIMEOUT)
+@query_budget(statements=1)
 async def get_habits(_: str = "") -> str:
     """
     Get the list of all tracked habits.
     """
     try:
-        async with async_session() as session:
+        async with read_session() as session:
             habits = await habit_service.get_habits(session)
             return str([h.name for h in habits])
     except Exception as e:
@@ -0,0 +1,87 @@
+import logging
+import random
+import time
+from typing import Any, Dict, List
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.core.capture import transcript_var
+from app.core.config import settings
+
+logger = logging.getLogger("app.agent.trace")
+
+
+def _clip(value: Any) -> str:
+    text = str(value)
+    limit = settings.AGENT_TRACE_MAX_CHARS
+    return text if len(text) <= limit else f"{text[:limit]}… ({len(text)} chars)"
+
+
+class AgentTraceHandler(BaseCallbackHandler):
+    """Structured replacement for ``AgentExecutor(verbose=True)``: one log record per tool call and LLM step."""
+
+    run_inline = True
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        logger.info("tool start", extra={"tool": (serialized or {}).get("name"), "input": _clip(input_str)})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        logger.info("tool end", extra={"tool": kwargs.get("name"), "output": _clip(getattr(output, "content", output))})
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        logger.warning("tool error", extra={"tool": kwargs.get("name"), "error": _clip(error)})
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                logger.info("llm step", extra={
+                    "text": _clip(generation.text),
+                    "tool_calls": [c["name"] for c in getattr(message, "tool_calls", None) or []],
+                })
+
+    def on_agent_finish(self, finish: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        logger.info("agent finish", extra={"output": _clip(finish.return_values.get("output"))})
+
+
+class TranscriptHandler(BaseCallbackHandler):
+    """
+    Appends each LLM step (text, tool calls, latency) of a captured request
+    to its transcript, so a replay can serve the same responses.
+    """
+
+    run_inline = True
+
+    def __init__(self, transcript: List[Dict[str, Any]]):
+        self.transcript = transcript
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        message = getattr(generation, "message", None)
+        self.transcript.append({
+            "text": generation.text if generation else "",
+            "tool_calls": [
+                {"name": c["name"], "args": c["args"], "id": c.get("id")}
+                for c in getattr(message, "tool_calls", None) or []
+            ],
+            "latency": time.perf_counter() - started if started else 0.0,
+        })
+
+
+def sampled_trace_handlers() -> List[BaseCallbackHandler]:
+    """Trace handler for this turn, if it falls within AGENT_TRACE_SAMPLE_RATE."""
+    if settings.AGENT_TRACE_SAMPLE_RATE > 0 and random.random() < settings.AGENT_TRACE_SAMPLE_RATE:
+        return [AgentTraceHandler()]
+    return []
+
+
+def capture_handlers() -> List[BaseCallbackHandler]:
+    """Transcript handler when the current request is being captured."""
+    transcript = transcript_var.get()
+    return [TranscriptHandler(transcript)] if transcript is not None else []
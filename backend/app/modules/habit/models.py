@@ -1,21 +1,27 @@
 from datetime import datetime, date as dt_date
 from typing import List, Optional, Any
 from sqlmodel import Field, SQLModel, Relationship, UniqueConstraint
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, ForeignKey, Index, Integer, JSON
 
 class Habit(SQLModel, table=True):
     __tablename__ = "habits"
+    __table_args__ = (UniqueConstraint("user_id", "name"),)
     
     id: Optional[int] = Field(default=None, primary_key=True)
-    name: str = Field(unique=True, nullable=False)
+    user_id: int = Field(foreign_key="users.id", nullable=False)
+    name: str = Field(nullable=False)
     
     entries: List["HabitEntry"] = Relationship(back_populates="habit")
 
 class HabitEntry(SQLModel, table=True):
     __tablename__ = "habit_entries"
-    __table_args__ = (UniqueConstraint("habit_id", "date"),)
+    __table_args__ = (
+        UniqueConstraint("habit_id", "date"),
+        Index("ix_habit_entries_user_date", "user_id", "date"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id", nullable=False)
     habit_id: int = Field(foreign_key="habits.id")
     date: dt_date = Field(nullable=False)
     value: dict = Field(default={}, sa_column=Column(JSON, nullable=False))
@@ -23,3 +29,20 @@ class HabitEntry(SQLModel, table=True):
     habit: Habit = Relationship(back_populates="entries")
 
 
+
+class HabitMetric(SQLModel, table=True):
+    """One numeric field of a ``HabitEntry.value``, kept in step with the entry so filters run in the database."""
+    __tablename__ = "habit_metrics"
+    __table_args__ = (
+        Index("ix_habit_metrics_user_habit_key_date", "user_id", "habit_id", "key", "date"),
+        Index("ix_habit_metrics_user_habit_key_value", "user_id", "habit_id", "key", "numeric_value"),
+    )
+
+    entry_id: int = Field(
+        sa_column=Column(Integer, ForeignKey("habit_entries.id", ondelete="CASCADE"), primary_key=True)
+    )
+    key: str = Field(primary_key=True)
+    user_id: int = Field(foreign_key="users.id", nullable=False)
+    habit_id: int = Field(foreign_key="habits.id", nullable=False)
+    date: dt_date = Field(nullable=False)
+    numeric_value: float = Field(nullable=False)
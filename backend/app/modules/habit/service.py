@@ -1,46 +1,219 @@
-from datetime import date
-from typing import List
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, func, insert
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.modules.habit.models import Habit, HabitEntry
+from app.core.cache import HABITS
+from app.core.events import changes
+from app.core.querybudget import query_budget
+from app.core.users import current_user_id
+from app.modules.habit.models import Habit, HabitEntry, HabitMetric
 
+
+def extract_metrics(value: Any, prefix: str = "") -> Dict[str, float]:
+    """
+    Numeric fields of an entry value: numbers as-is, booleans as 1/0, nested
+    dicts flattened to dotted keys. Anything else is not a metric.
+    """
+    metrics: Dict[str, float] = {}
+    if not isinstance(value, dict):
+        return metrics
+    for key, item in value.items():
+        name = f"{prefix}{key}"
+        if isinstance(item, bool):
+            metrics[name] = 1.0 if item else 0.0
+        elif isinstance(item, (int, float)):
+            metrics[name] = float(item)
+        elif isinstance(item, dict):
+            metrics.update(extract_metrics(item, f"{name}."))
+    return metrics
+
+
+async def _write_metrics(
+    db: AsyncSession, user_id: int, date: date, entries: Iterable[Tuple[int, int, dict]], replace: List[int]
+) -> None:
+    """Replace the metric rows of ``entries`` (entry_id, habit_id, value); ``replace`` lists entries that may have old rows."""
+    if replace:
+        await db.exec(delete(HabitMetric).where(HabitMetric.entry_id.in_(replace)))
+    rows = [
+        {"entry_id": entry_id, "user_id": user_id, "habit_id": habit_id, "date": date, "key": key, "numeric_value": number}
+        for entry_id, habit_id, value in entries
+        for key, number in extract_metrics(value).items()
+    ]
+    if rows:
+        await db.exec(insert(HabitMetric), params=rows)
+
+@query_budget(statements=3, commits=1)
 async def get_habit_id(db: AsyncSession, name: str) -> int:
-    statement = select(Habit).where(Habit.name == name)
+    user_id = current_user_id()
+    statement = select(Habit).where(Habit.user_id == user_id, Habit.name == name)
     result = await db.exec(statement)
     habit = result.first()
     
     if not habit:
-        habit = Habit(name=name)
+        habit = Habit(user_id=user_id, name=name)
         db.add(habit)
         await db.commit()
         await db.refresh(habit)
+        await changes.publish(HABITS, "created", {"habit_id": habit.id, "name": habit.name})
     
     return habit.id
 
+@query_budget(statements=5, commits=1)
 async def upsert_habit_entry(db: AsyncSession, habit_id: int, date: date, value: dict) -> HabitEntry:
-    statement = select(HabitEntry).where(HabitEntry.habit_id == habit_id, HabitEntry.date == date)
+    user_id = current_user_id()
+    statement = select(HabitEntry).where(
+        HabitEntry.user_id == user_id, HabitEntry.habit_id == habit_id, HabitEntry.date == date
+    )
     result = await db.exec(statement)
     entry = result.first()
     
+    replace = [entry.id] if entry else []
     if entry:
         entry.value = value
         db.add(entry)
     else:
-        entry = HabitEntry(habit_id=habit_id, date=date, value=value)
+        entry = HabitEntry(user_id=user_id, habit_id=habit_id, date=date, value=value)
         db.add(entry)
-        
+
+    await db.flush()
+    await _write_metrics(db, user_id, date, [(entry.id, habit_id, value)], replace)
     await db.commit()
     await db.refresh(entry)
+    await changes.publish(HABITS, "upserted", {"habit_id": habit_id, "date": date.isoformat()})
     return entry
 
+@query_budget(statements=7, commits=1)
+async def upsert_habit_entries(db: AsyncSession, date: date, values: Dict[str, dict]) -> None:
+    """
+    Upsert one day's entries for several habits in a constant number of
+    round trips, creating habits that don't exist yet.
+    """
+    if not values:
+        return
+
+    user_id = current_user_id()
+    result = await db.exec(
+        select(Habit.name, Habit.id).where(Habit.user_id == user_id, Habit.name.in_(list(values)))
+    )
+    ids = dict(result.all())
+    missing = [name for name in values if name not in ids]
+    if missing:
+        result = await db.exec(
+            insert(Habit).values([{"user_id": user_id, "name": name} for name in missing]).returning(Habit.name, Habit.id)
+        )
+        ids.update(dict(result.all()))
+
+    statement = select(HabitEntry).where(
+        HabitEntry.user_id == user_id, HabitEntry.habit_id.in_(list(ids.values())), HabitEntry.date == date
+    )
+    result = await db.exec(statement)
+    existing = {entry.habit_id: entry for entry in result.all()}
+
+    new_entries, written = [], []
+    for name, value in values.items():
+        entry = existing.get(ids[name])
+        if entry:
+            entry.value = value
+            db.add(entry)
+            written.append((entry.id, entry.habit_id, value))
+        else:
+            new_entries.append({"user_id": user_id, "habit_id": ids[name], "date": date, "value": value})
+    if new_entries:
+        result = await db.exec(
+            insert(HabitEntry).values(new_entries).returning(HabitEntry.id, HabitEntry.habit_id, HabitEntry.value)
+        )
+        written.extend(tuple(row) for row in result.all())
+
+    await _write_metrics(db, user_id, date, written, [entry.id for entry in existing.values()])
+    await db.commit()
+    for name in missing:
+        await changes.publish(HABITS, "created", {"habit_id": ids[name], "name": name})
+    for name in values:
+        await changes.publish(HABITS, "upserted", {"habit_id": ids[name], "date": date.isoformat()})
+
+@query_budget(statements=1)
 async def get_today_habits(db: AsyncSession) -> List[HabitEntry]:
     today = date.today()
-    statement = select(HabitEntry).where(HabitEntry.date == today)
+    statement = select(HabitEntry).where(HabitEntry.user_id == current_user_id(), HabitEntry.date == today)
     result = await db.exec(statement)
     return result.all()
 
+@query_budget(statements=1)
 async def get_habits(db: AsyncSession) -> List[Habit]:
-    statement = select(Habit)
+    statement = select(Habit).where(Habit.user_id == current_user_id())
     result = await db.exec(statement)
     return result.all()
+
+@query_budget(statements=1)
+async def get_streaks(db: AsyncSession, through: date, lookback_days: int) -> Dict[str, int]:
+    """Per habit, the consecutive days done up to ``through``, looking back at most ``lookback_days``."""
+    statement = (
+        select(Habit.name, HabitEntry.date, HabitEntry.value)
+        .join(Habit, Habit.id == HabitEntry.habit_id)
+        .where(
+            HabitEntry.user_id == current_user_id(),
+            HabitEntry.date > through - timedelta(days=lookback_days),
+            HabitEntry.date <= through,
+        )
+    )
+    result = await db.exec(statement)
+    done: Dict[str, set] = {}
+    for name, day, value in result.all():
+        days = done.setdefault(name, set())
+        if not (isinstance(value, dict) and value.get("completed") is False):
+            days.add(day)
+
+    streaks = {}
+    for name, days in done.items():
+        streak = 0
+        while through - timedelta(days=streak) in days:
+            streak += 1
+        streaks[name] = streak
+    return streaks
+
+
+def _metric_filter(statement, habit: str, key: str, start: Optional[date], end: Optional[date]):
+    user_id = current_user_id()
+    statement = statement.join(Habit, Habit.id == HabitMetric.habit_id).where(
+        Habit.user_id == user_id, Habit.name == habit, HabitMetric.user_id == user_id, HabitMetric.key == key
+    )
+    if start:
+        statement = statement.where(HabitMetric.date >= start)
+    if end:
+        statement = statement.where(HabitMetric.date <= end)
+    return statement
+
+@query_budget(statements=1)
+async def aggregate_metric(
+    db: AsyncSession, habit: str, key: str, start: Optional[date] = None, end: Optional[date] = None
+) -> Dict[str, Optional[float]]:
+    """Count, average, min, max and sum of one metric (e.g. sleep ``duration``) over a date range."""
+    value = HabitMetric.numeric_value
+    statement = _metric_filter(
+        select(func.count(value), func.avg(value), func.min(value), func.max(value), func.sum(value)).select_from(HabitMetric),
+        habit, key, start, end,
+    )
+    result = await db.exec(statement)
+    count, avg, low, high, total = result.one()
+    return {"count": count, "avg": avg, "min": low, "max": high, "sum": total}
+
+@query_budget(statements=1)
+async def dates_with_metric(
+    db: AsyncSession,
+    habit: str,
+    key: str,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> List[date]:
+    """Days on which a metric was within bounds, e.g. at least 10 reading ``pages``."""
+    statement = _metric_filter(select(HabitMetric.date), habit, key, start, end)
+    if min_value is not None:
+        statement = statement.where(HabitMetric.numeric_value >= min_value)
+    if max_value is not None:
+        statement = statement.where(HabitMetric.numeric_value <= max_value)
+    result = await db.exec(statement.order_by(HabitMetric.date))
+    return list(result.all())
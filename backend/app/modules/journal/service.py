@@ -3,10 +3,16 @@ from typing import Optional
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.core.cache import JOURNAL
+from app.core.events import changes
+from app.core.querybudget import query_budget
+from app.core.users import current_user_id
 from app.modules.journal.models import DailyJournal
 
+@query_budget(statements=3, commits=1)
 async def upsert_daily_journal(db: AsyncSession, date: date, text: str, meta: dict) -> DailyJournal:
-    statement = select(DailyJournal).where(DailyJournal.date == date)
+    user_id = current_user_id()
+    statement = select(DailyJournal).where(DailyJournal.user_id == user_id, DailyJournal.date == date)
     result = await db.exec(statement)
     journal = result.first()
     
@@ -15,15 +21,17 @@ async def upsert_daily_journal(db: AsyncSession, date: date, text: str, meta: di
         journal.meta = meta
         db.add(journal)
     else:
-        journal = DailyJournal(date=date, text=text, meta=meta)
+        journal = DailyJournal(user_id=user_id, date=date, text=text, meta=meta)
         db.add(journal)
         
     await db.commit()
     await db.refresh(journal)
+    await changes.publish(JOURNAL, "upserted", {"id": journal.id, "date": date.isoformat()})
     return journal
 
+@query_budget(statements=1)
 async def get_today_journal(db: AsyncSession) -> Optional[DailyJournal]:
     today = date.today()
-    statement = select(DailyJournal).where(DailyJournal.date == today)
+    statement = select(DailyJournal).where(DailyJournal.user_id == current_user_id(), DailyJournal.date == today)
     result = await db.exec(statement)
     return result.first()
@@ -3,10 +3,16 @@ from typing import List, Optional
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.core.cache import PLANS
+from app.core.events import changes
+from app.core.querybudget import query_budget
+from app.core.users import current_user_id
 from app.modules.plan.models import Plan
 
+@query_budget(statements=3, commits=1)
 async def upsert_plan(db: AsyncSession, date: date, tasks: List[str]) -> Plan:
-    statement = select(Plan).where(Plan.date == date)
+    user_id = current_user_id()
+    statement = select(Plan).where(Plan.user_id == user_id, Plan.date == date)
     result = await db.exec(statement)
     plan = result.first()
     
@@ -14,15 +20,20 @@ async def upsert_plan(db: AsyncSession, date: date, tasks: List[str]) -> Plan:
         plan.tasks = tasks
         db.add(plan)
     else:
-        plan = Plan(date=date, tasks=tasks)
+        plan = Plan(user_id=user_id, date=date, tasks=tasks)
         db.add(plan)
         
     await db.commit()
     await db.refresh(plan)
+    await changes.publish(PLANS, "upserted", {"id": plan.id, "date": date.isoformat()})
     return plan
 
-async def get_yesterday_plan(db: AsyncSession) -> Optional[Plan]:
-    yesterday = date.today() - timedelta(days=1)
-    statement = select(Plan).where(Plan.date == yesterday)
+@query_budget(statements=1)
+async def get_plan(db: AsyncSession, date: date) -> Optional[Plan]:
+    statement = select(Plan).where(Plan.user_id == current_user_id(), Plan.date == date)
     result = await db.exec(statement)
     return result.first()
+
+@query_budget(statements=1)
+async def get_yesterday_plan(db: AsyncSession) -> Optional[Plan]:
+    return await get_plan(db, date.today() - timedelta(days=1))
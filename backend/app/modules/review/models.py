@@ -0,0 +1,16 @@
+from datetime import datetime, date as dt_date
+from typing import Dict, Optional
+from sqlmodel import Field, SQLModel, UniqueConstraint
+from sqlalchemy import Column, JSON, Text
+
+class DailySnapshot(SQLModel, table=True):
+    """Precomputed parts of a daily review: habit streaks through yesterday and yesterday's plan."""
+    __tablename__ = "daily_snapshots"
+    __table_args__ = (UniqueConstraint("user_id", "date"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id", nullable=False)
+    date: dt_date = Field(nullable=False)
+    streaks: Dict[str, int] = Field(default={}, sa_column=Column(JSON, nullable=False))
+    plan_summary: str = Field(default="", sa_column=Column(Text, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
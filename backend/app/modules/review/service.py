@@ -0,0 +1,94 @@
+import logging
+from datetime import date, timedelta
+from typing import Optional, Sequence
+from sqlalchemy import delete
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import async_session
+from app.core.metrics import metrics
+from app.core.querybudget import query_budget
+from app.core.scheduler import yield_to_requests
+from app.core.users import current_user_id, current_user_var
+from app.modules.habit import service as habit_service
+from app.modules.plan import service as plan_service
+from app.modules.plan.models import Plan
+from app.modules.review.models import DailySnapshot
+from app.modules.user import service as user_service
+
+logger = logging.getLogger(__name__)
+
+# Snapshots older than this are pruned by the daily job
+SNAPSHOT_RETENTION_DAYS = 7
+
+
+def summarize_plan(plan: Optional[Plan]) -> str:
+    if plan is None or not plan.tasks:
+        return "None"
+    return f"{len(plan.tasks)} tasks for {plan.date}: " + "; ".join(plan.tasks)
+
+
+@query_budget(statements=2)
+async def build_snapshot(db: AsyncSession, day: date) -> DailySnapshot:
+    """Compute ``day``'s snapshot for the current user without storing it."""
+    yesterday = day - timedelta(days=1)
+    streaks = await habit_service.get_streaks(db, yesterday, settings.STREAK_LOOKBACK_DAYS)
+    plan = await plan_service.get_plan(db, yesterday)
+    return DailySnapshot(user_id=current_user_id(), date=day, streaks=streaks, plan_summary=summarize_plan(plan))
+
+@query_budget(statements=1)
+async def get_snapshot(db: AsyncSession, day: date) -> Optional[DailySnapshot]:
+    statement = select(DailySnapshot).where(DailySnapshot.user_id == current_user_id(), DailySnapshot.date == day)
+    result = await db.exec(statement)
+    return result.first()
+
+@query_budget(statements=4, commits=1)
+async def refresh_snapshot(db: AsyncSession, day: date) -> DailySnapshot:
+    built = await build_snapshot(db, day)
+    snapshot = await get_snapshot(db, day)
+    if snapshot:
+        snapshot.streaks = built.streaks
+        snapshot.plan_summary = built.plan_summary
+    else:
+        snapshot = built
+    db.add(snapshot)
+    await db.commit()
+    return snapshot
+
+@query_budget(statements=3)
+async def get_today_snapshot(db: AsyncSession) -> DailySnapshot:
+    """Today's precomputed snapshot, or one built on the spot if the daily job hasn't covered this user yet."""
+    today = date.today()
+    snapshot = await get_snapshot(db, today)
+    if snapshot is None:
+        metrics.incr("review.snapshot_misses")
+        snapshot = await build_snapshot(db, today)
+    return snapshot
+
+
+@query_budget(
+    statements=lambda user_ids: 1 + 4 * len(user_ids),
+    commits=lambda user_ids: 1 + len(user_ids),
+)
+async def precompute_snapshots(db: AsyncSession, day: date, user_ids: Sequence[int]) -> int:
+    """Store ``day``'s snapshot for each user and prune old ones; returns how many were written."""
+    await db.exec(delete(DailySnapshot).where(DailySnapshot.date < day - timedelta(days=SNAPSHOT_RETENTION_DAYS)))
+    await db.commit()
+    for user_id in user_ids:
+        token = current_user_var.set(user_id)
+        try:
+            await refresh_snapshot(db, day)
+        finally:
+            current_user_var.reset(token)
+        await yield_to_requests()
+    return len(user_ids)
+
+
+async def run_daily_snapshots() -> None:
+    """Scheduled job: today's snapshot for every user."""
+    today = date.today()
+    async with async_session() as session:
+        user_ids = await user_service.get_user_ids(session)
+        written = await precompute_snapshots(session, today, user_ids)
+    logger.info("Precomputed %d daily snapshots for %s", written, today)
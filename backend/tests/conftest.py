@@ -0,0 +1,88 @@
+import os
+import tempfile
+
+# Settings and engines are read at import, so point them at a scratch
+# SQLite database before anything from the app is imported.
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ["QUERY_BUDGET_MODE"] = "raise"
+os.environ["SCHEDULER_ENABLED"] = "false"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel
+
+import app.main  # noqa: F401  (registers every model and budget)
+from app.core.cache import response_cache
+from app.core.db import async_engine, async_session, read_engine, sync_engine
+from app.core.log import request_id_var
+from app.core.querybudget import BUDGETS, count_queries
+from app.modules.gemini.replay import ReplayChatModel
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db(anyio_backend):
+    """Session on a freshly created schema."""
+    # Tokens read from a fresh database repeat those of earlier tests
+    response_cache.clear()
+    async with async_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with async_session() as session:
+        yield session
+    # Connections are bound to this test's event loop
+    await async_engine.dispose()
+    await read_engine.dispose()
+
+
+@pytest.fixture
+def client():
+    """The app on a fresh schema, with its lifespan running."""
+    SQLModel.metadata.drop_all(sync_engine)
+    response_cache.clear()
+    with TestClient(app.main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def within_budget():
+    """
+    Await a call under the statement and commit counter and fail if it goes
+    over the budget declared for ``name`` in ``BUDGETS``; callable budgets
+    get ``budget_args``.
+    """
+    async def check(name, call, **budget_args):
+        statements, commits = BUDGETS[name]
+        max_statements = statements(**budget_args) if callable(statements) else statements
+        max_commits = commits(**budget_args) if callable(commits) else commits
+        with count_queries() as counter:
+            result = await call
+        assert counter.statements <= max_statements, (
+            f"{name} made {counter.statements} statements (budget {max_statements})"
+        )
+        assert counter.commits <= max_commits, f"{name} made {counter.commits} commits (budget {max_commits})"
+        return result
+    return check
+
+
+@pytest.fixture
+def stub_llm():
+    """
+    ``GeminiService`` llm_factory replaying scripted steps ({"text", "tool_calls",
+    "latency"}); returns the factory and the model names it built.
+    """
+    def make(steps, speed=1.0):
+        built = []
+        # Outside a request every turn has the same (default) request ID
+        model = ReplayChatModel(transcripts={request_id_var.get(): steps}, speed=speed)
+
+        def factory(name):
+            built.append(name)
+            return model
+
+        return factory, built
+    return make
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from app.core import deadline
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.modules.gemini.service import GeminiService
+from app.modules.habit import service as habit_service
+
+
+def call(name, args, id):
+    return {"text": "", "tool_calls": [{"name": name, "args": args, "id": id}]}
+
+
+JOURNAL = call("save_journal", {"entry": {"text": "Long day."}}, "journal")
+
+
+async def slow_upsert(*args, **kwargs):
+    await asyncio.sleep(5)
+
+
+@pytest.mark.anyio
+async def test_turn_deadline_lists_the_writes_that_went_through(db, stub_llm, monkeypatch):
+    monkeypatch.setattr(settings, "AGENT_TURN_TIMEOUT", 0.3)
+    factory, _ = stub_llm([JOURNAL, {"text": "Done!", "tool_calls": [], "latency": 5}])
+
+    reply = await GeminiService(llm_factory=factory).generate_content("journal: long day")
+
+    assert reply.splitlines() == [
+        "I had to stop before finishing (time limit reached).",
+        "Completed so far:",
+        "- Journal entry saved.",
+    ]
+
+
+@pytest.mark.anyio
+async def test_timed_out_tool_is_reported_and_not_listed_as_done(db, stub_llm, monkeypatch):
+    # Per-tool timeout far below the turn's
+    monkeypatch.setattr(deadline, "budget", lambda timeout: 0.05)
+    monkeypatch.setattr(habit_service, "upsert_habit_entries", slow_upsert)
+    before = metrics.counter("agent.tool_timeouts.save_habits")
+    factory, _ = stub_llm([
+        JOURNAL,
+        call("save_habits", {"habits": {"exercise": True}}, "habits"),
+        {"text": "", "tool_calls": [], "latency": 5},
+    ])
+    monkeypatch.setattr(settings, "AGENT_TURN_TIMEOUT", 0.5)
+
+    reply = await GeminiService(llm_factory=factory).generate_content("journal: long day, exercise done")
+
+    assert metrics.counter("agent.tool_timeouts.save_habits") == before + 1
+    assert "- Journal entry saved." in reply
+    assert "save_habits" not in reply and "Habits saved" not in reply
+
+
+@pytest.mark.anyio
+async def test_iteration_cap_stops_the_turn(db, stub_llm, monkeypatch):
+    monkeypatch.setattr(settings, "AGENT_MAX_ITERATIONS", 2)
+    factory, _ = stub_llm([call("get_habits", {"_": ""}, f"read-{i}") for i in range(5)], speed=0)
+
+    reply = await GeminiService(llm_factory=factory).generate_content("what did I log today?")
+
+    assert reply.splitlines() == [
+        "I had to stop before finishing (too many steps).",
+        "Nothing was saved; please try again.",
+    ]
@@ -0,0 +1,21 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.modules.chat import archive
+from app.modules.chat.models import Message
+from app.modules.gemini import tools
+
+
+@pytest.mark.anyio
+async def test_context_keeps_archived_days_as_digests(db):
+    old = datetime.utcnow() - timedelta(days=200)
+    db.add(Message(user_id=1, role="user", content="ran a half marathon", created_at=old))
+    db.add_all([Message(user_id=1, role="user", content=f"recent {i}") for i in range(20)])
+    await db.commit()
+    await archive.archive_batch(db, datetime.utcnow() - timedelta(days=90), 500)
+
+    context = await tools.get_context.ainvoke({"_": ""})
+
+    assert "ran a half marathon" in context.split("--- Last Messages ---")[0]
+    assert f"{old.date()} (1 messages)" in context
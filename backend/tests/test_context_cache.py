@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.modules.gemini.prefix import PromptPrefix, ProviderContextCache
+
+
+class FakeCaches:
+    def __init__(self):
+        self.created = []
+        self.deleted = []
+        self.fail = False
+
+    async def create(self, model, config):
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("quota")
+        self.created.append(model)
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+    async def delete(self, name):
+        self.deleted.append(name)
+
+
+def provider_cache():
+    caches = FakeCaches()
+    cache = ProviderContextCache(api_key="test", ttl_seconds=3600)
+    cache._client = SimpleNamespace(aio=SimpleNamespace(caches=caches))
+    return cache, caches
+
+
+PREFIX = PromptPrefix(text="system", digest="a" * 64, fingerprint=())
+
+
+@pytest.mark.anyio
+async def test_concurrent_turns_share_one_create(anyio_backend):
+    cache, caches = provider_cache()
+    names = await asyncio.gather(*(cache.name_for("flash", PREFIX, []) for _ in range(5)))
+    assert set(names) == {"cachedContents/1"}
+    assert caches.created == ["flash"]
+
+
+@pytest.mark.anyio
+async def test_refresh_and_new_prefix_delete_the_replaced_cache(anyio_backend):
+    cache, caches = provider_cache()
+    await cache.name_for("flash", PREFIX, [])
+    # Within REFRESH_MARGIN of its TTL: recreated, and the old one deleted
+    cache._entries[("flash", PREFIX.digest)] = ("cachedContents/1", 0)
+    assert await cache.name_for("flash", PREFIX, []) == "cachedContents/2"
+    assert caches.deleted == ["cachedContents/1"]
+
+    changed = PromptPrefix(text="new system", digest="b" * 64, fingerprint=())
+    assert await cache.name_for("flash", changed, []) == "cachedContents/3"
+    assert caches.deleted == ["cachedContents/1", "cachedContents/2"]
+
+
+@pytest.mark.anyio
+async def test_failed_create_is_retried_after_a_backoff(anyio_backend, monkeypatch):
+    cache, caches = provider_cache()
+    caches.fail = True
+    assert await cache.name_for("flash", PREFIX, []) is None
+    caches.fail = False
+    # Still backing off: inline, no new create call
+    assert await cache.name_for("flash", PREFIX, []) is None
+    assert caches.created == []
+
+    key = ("flash", PREFIX.digest)
+    cache._retry[key] = (0.0, cache._retry[key][1])
+    assert await cache.name_for("flash", PREFIX, []) == "cachedContents/1"
+    assert key not in cache._retry
@@ -0,0 +1,156 @@
+import asyncio
+import sys
+import types
+
+import pytest
+
+from app.core import events
+from app.core.cache import versions
+from app.core.events import ChangeEvent, ChangeHub
+from app.core.users import current_user_var
+
+
+def event(seq):
+    return ChangeEvent(seq=seq, resource="habits", action="upserted", user_id=1)
+
+
+@pytest.mark.anyio
+async def test_late_event_is_released_in_order(anyio_backend):
+    hub = ChangeHub()
+    hub.deliver(event(2))
+    assert hub.since(0) == ([], False)
+    hub.deliver(event(1))
+    assert [e.seq for e in hub.since(0)[0]] == [1, 2]
+    assert hub.seq == 2
+
+
+@pytest.mark.anyio
+async def test_gap_is_skipped_after_the_reorder_window(anyio_backend, monkeypatch):
+    monkeypatch.setattr(events, "REORDER_SECONDS", 0.05)
+    hub = ChangeHub()
+    hub.deliver(event(1))
+    hub.deliver(event(3))
+    assert [e.seq for e in hub.since(0)[0]] == [1]
+    await asyncio.sleep(0.1)
+    assert [e.seq for e in hub.since(1)[0]] == [3]
+    hub.deliver(event(2))
+    assert [e.seq for e in hub.since(0)[0]] == [1, 3]
+
+
+@pytest.mark.anyio
+async def test_publish_bumps_versions_once(anyio_backend):
+    hub = ChangeHub()
+    before = versions.version("habits", 1)
+    await hub.publish("habits", "upserted", user_id=1)
+    assert versions.version("habits", 1) == before + 1
+    assert hub.seq == 1
+
+
+@pytest.mark.anyio
+async def test_writes_only_wake_their_own_user(anyio_backend):
+    hub = ChangeHub()
+
+    async def subscribe(user_id):
+        token = current_user_var.set(user_id)
+        try:
+            return await hub.wait(0, 0.2)
+        finally:
+            current_user_var.reset(token)
+
+    other = asyncio.ensure_future(subscribe(2))
+    mine = asyncio.ensure_future(subscribe(1))
+    await asyncio.sleep(0)
+    hub.deliver(event(1))
+    events, reset = await mine
+    assert [e.seq for e in events] == [1] and not reset
+    assert not other.done()
+    assert await other == ([], False)
+
+
+@pytest.mark.anyio
+async def test_buffers_and_eviction_are_per_user(anyio_backend):
+    hub = ChangeHub(history=2, max_users=2)
+    for seq in (1, 2, 3):
+        hub.deliver(ChangeEvent(seq=seq, resource="habits", action="upserted", user_id=1))
+    hub.deliver(ChangeEvent(seq=4, resource="habits", action="upserted", user_id=2))
+    # User 1 overflowed its own buffer; user 2 did not
+    events, reset = hub.since(0, user_id=1)
+    assert [e.seq for e in events] == [2, 3] and reset
+    assert [e.seq for e in hub.since(0, user_id=2)[0]] == [4]
+    assert not hub.since(0, user_id=2)[1]
+
+    hub.deliver(ChangeEvent(seq=5, resource="habits", action="upserted", user_id=3))
+    assert list(hub._feeds) == [2, 3]
+    # User 1's events were evicted: an old subscriber resets, a current one doesn't
+    assert hub.since(2, user_id=1) == ([], True)
+    assert hub.since(5, user_id=1) == ([], False)
+
+
+class FakeConnection:
+    """Just enough of an asyncpg connection for the feed backend."""
+
+    def __init__(self, seq):
+        self.seq = seq
+        self.terminated = []
+
+    async def execute(self, sql):
+        pass
+
+    async def add_listener(self, channel, callback):
+        pass
+
+    async def remove_listener(self, channel, callback):
+        pass
+
+    async def fetchval(self, sql, *args):
+        return self.seq
+
+    def add_termination_listener(self, callback):
+        self.terminated.append(callback)
+
+    def remove_termination_listener(self, callback):
+        self.terminated.remove(callback)
+
+    async def close(self):
+        pass
+
+    def drop(self):
+        for callback in self.terminated:
+            callback(self)
+
+
+@pytest.mark.anyio
+async def test_backend_reconnects_and_resyncs_after_losing_the_listener(anyio_backend, monkeypatch):
+    connections = [FakeConnection(10), FakeConnection(15)]
+    fails = [True]
+
+    async def connect(dsn):
+        if fails and len(connections) == 1:
+            fails.pop()
+            raise OSError("database unavailable")
+        return connections.pop(0)
+
+    monkeypatch.setitem(sys.modules, "asyncpg", types.SimpleNamespace(connect=connect))
+    monkeypatch.setattr(events, "RECONNECT_SECONDS", 0.01)
+    monkeypatch.setattr(versions, "shared", False)
+    hub = ChangeHub()
+    backend = events.PostgresChangeBackend("postgresql://db/lifeos", hub)
+    await backend.start()
+    first = backend._conn
+    assert versions.shared and hub.seq == 10
+    hub.deliver(ChangeEvent(seq=11, resource="habits", action="upserted", user_id=1))
+    assert versions.known(["habits"], 1)
+
+    first.drop()
+    assert not versions.shared
+    with pytest.raises(ConnectionError):
+        await backend.publish("habits", "upserted", 1, {})
+
+    # One failed attempt, then back with everything after the outage unknown
+    while backend._conn is None:
+        await asyncio.sleep(0.01)
+    assert versions.shared and hub.seq == 15
+    assert not versions.known(["habits"], 1)
+    assert hub.since(11, user_id=1) == ([], True)
+    await backend.stop()
+    assert not versions.shared
@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.modules.chat.fastpath import FastPath, parse
+from app.modules.journal import service as journal_service
+from app.modules.plan import service as plan_service
+
+NAMES = {"exercise": "exercise", "water": "water"}
+
+
+@pytest.mark.parametrize("message", [
+    "Tomorrow - should I focus on the gym or on work?",
+    "note: what did I write yesterday?",
+    "plan: help me figure out my week",
+    "journal: how was my week",
+    "did I do exercise?",
+])
+def test_questions_go_to_the_agent(message):
+    assert parse(message, NAMES) is None
+
+
+def test_structured_commands():
+    assert parse("journal: long day, good run", NAMES).intent == "journal"
+    assert parse("plan: gym; write report", NAMES).intent == "plan"
+    result = parse("exercise done, water done", NAMES)
+    assert result.intent == "habits" and result.confidence == 1.0
+
+
+@pytest.mark.anyio
+async def test_journal_appends_to_todays_entry(db):
+    await journal_service.upsert_daily_journal(db, date.today(), "Morning run.", {"wins": ["run"], "improvements": []})
+    result = await FastPath().handle(db, "journal: Evening was calm.")
+    journal = await journal_service.get_today_journal(db)
+    assert result.intent == "journal"
+    assert journal.text == "Morning run.\n\nEvening was calm."
+    assert journal.meta["wins"] == ["run"]
+
+
+@pytest.mark.anyio
+async def test_plan_appends_to_tomorrows_plan(db):
+    tomorrow = date.today() + timedelta(days=1)
+    await plan_service.upsert_plan(db, tomorrow, ["gym"])
+    await FastPath().handle(db, "plan: write report; gym")
+    plan = await plan_service.get_plan(db, tomorrow)
+    assert plan.tasks == ["gym", "write report"]
+
+
+@pytest.mark.anyio
+async def test_plan_question_leaves_plan_alone(db):
+    tomorrow = date.today() + timedelta(days=1)
+    await plan_service.upsert_plan(db, tomorrow, ["gym"])
+    assert await FastPath().handle(db, "plan: help me figure out my week") is None
+    assert (await plan_service.get_plan(db, tomorrow)).tasks == ["gym"]
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app.core.cache import MESSAGES, VersionTracker, versions
+from app.core.db import sync_engine
+from app.core.events import ChangeEvent, changes
+from app.modules.chat.models import Message
+
+
+def test_etag_follows_writes_from_other_workers(client):
+    client.post("/api/v1/chat/", params={"message": "journal: quiet day"})
+    etag = client.get("/api/v1/chat/").headers["etag"]
+    assert client.get("/api/v1/chat/", headers={"If-None-Match": etag}).status_code == 304
+
+    # Written through another worker: in the database, unknown to this process
+    with sync_engine.begin() as conn:
+        conn.execute(insert(Message).values(user_id=1, role="user", content="from elsewhere", created_at=datetime.utcnow()))
+
+    response = client.get("/api/v1/chat/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "from elsewhere" in response.text
+
+
+def test_feed_versions_agree_across_workers():
+    early, late = VersionTracker(), VersionTracker()
+    early.bump(MESSAGES, 1, seq=5)
+    early.bump(MESSAGES, 1, seq=9)
+    # Started after seq 5: only saw the last write
+    late.bump(MESSAGES, 1, seq=9)
+    assert early.etag([MESSAGES], "/api/v1/chat/", user_id=1) == late.etag([MESSAGES], "/api/v1/chat/", user_id=1)
+
+
+def test_shared_feed_etag_follows_writes_from_other_workers(client, monkeypatch):
+    monkeypatch.setattr(versions, "shared", True)
+    client.post("/api/v1/chat/", params={"message": "journal: quiet day"})
+    etag = client.get("/api/v1/chat/").headers["etag"]
+    assert versions.known([MESSAGES], 1)
+    assert client.get("/api/v1/chat/", headers={"If-None-Match": etag}).status_code == 304
+
+    # Another worker writes and notifies the feed
+    with sync_engine.begin() as conn:
+        conn.execute(insert(Message).values(user_id=1, role="user", content="from elsewhere", created_at=datetime.utcnow()))
+    changes.deliver(ChangeEvent(seq=changes.seq + 1, resource=MESSAGES, action="created", user_id=1))
+
+    response = client.get("/api/v1/chat/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "from elsewhere" in response.text
+
+
+def add_message(content):
+    with sync_engine.begin() as conn:
+        conn.execute(insert(Message).values(user_id=1, role="user", content=content, created_at=datetime.utcnow()))
+
+
+def test_compression_follows_accept_encoding_and_size(client):
+    client.get("/api/v1/chat/")  # creates the schema
+    add_message("short")
+    small = client.get("/api/v1/chat/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    add_message("a long day " * 200)
+    assert client.get("/api/v1/chat/", headers={"Accept-Encoding": "br;q=0, gzip"}).headers["content-encoding"] == "gzip"
+    assert client.get("/api/v1/chat/", headers={"Accept-Encoding": "gzip, br"}).headers["content-encoding"] == "br"
+    identity = client.get("/api/v1/chat/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert not identity.headers["etag"].startswith("W/")
+
+
+def test_not_modified_etag_matches_the_compressed_one(client):
+    client.get("/api/v1/chat/")
+    add_message("a long day " * 200)
+    response = client.get("/api/v1/chat/", headers={"Accept-Encoding": "gzip"})
+    etag = response.headers["etag"]
+    assert response.headers["content-encoding"] == "gzip" and etag.startswith("W/")
+
+    revalidated = client.get("/api/v1/chat/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+
+
+def test_fields_and_truncate(client):
+    assert client.get("/api/v1/chat/", params={"fields": "content,secret"}).status_code == 400
+
+    add_message("a long day " * 10)
+    data = client.get("/api/v1/chat/", params={"fields": "role,content", "truncate": 5}).json()["data"]
+    assert data == [{"role": "user", "content": "a lon", "content_length": 110}]
@@ -0,0 +1,16 @@
+import pytest
+
+from app.modules.gemini.knowledge import KnowledgeIndex
+
+
+@pytest.mark.anyio
+async def test_files_are_checked_at_most_once_per_interval(anyio_backend, tmp_path):
+    (tmp_path / "sleep.md").write_text("# Sleep\n\nAim for eight hours of sleep.")
+    index = KnowledgeIndex(str(tmp_path), min_interval=3600)
+    assert "eight hours" in await index.context_for("sleep")
+
+    (tmp_path / "water.md").write_text("# Water\n\nDrink eight glasses of water.")
+    assert await index.context_for("water") == ""
+
+    index.min_interval = 0
+    assert "glasses" in await index.context_for("water")
@@ -0,0 +1,56 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.core.metrics import metrics
+from app.core.profiling import CPROFILE, LoopWatchdog, ProfileConfig, profiler
+
+
+def test_request_id_cannot_escape_the_profile_directory(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "directory", str(tmp_path / "profiles"))
+    profiler.enable(ProfileConfig(mode=CPROFILE, routes=("/health",)))
+    try:
+        response = client.get("/health", headers={"X-Request-ID": "../../etc/x.y"})
+    finally:
+        profiler.disable()
+
+    assert response.status_code == 200
+    names = os.listdir(tmp_path / "profiles")
+    assert len(names) == 1 and names[0].endswith("-health-etcxy.prof")
+    assert not (tmp_path / "etc").exists()
+
+
+@pytest.mark.anyio
+async def test_watchdog_records_stalls_and_stops_without_blocking(anyio_backend, tmp_path):
+    watchdog = LoopWatchdog(str(tmp_path / "profiles"))
+    before = metrics.counter("loop.stalls")
+    watchdog.start(0.05)
+    await asyncio.sleep(0.05)
+    time.sleep(0.3)  # blocks the loop
+    await asyncio.sleep(0.05)
+    monitor = watchdog._monitor
+    watchdog.stop()
+
+    assert not watchdog.active and watchdog._monitor is None
+    await asyncio.to_thread(monitor.join, 1)
+    assert not monitor.is_alive()
+    assert metrics.counter("loop.stalls") == before + 1
+    assert "test_watchdog_records_stalls" in (tmp_path / "profiles" / "stalls.folded").read_text()
+
+
+@pytest.mark.anyio
+async def test_files_lists_newest_first(anyio_backend, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "directory", str(tmp_path / "profiles"))
+    profiler.enable(ProfileConfig(mode=CPROFILE))
+    profiler.disable()
+    # Nothing written yet, so no directory either
+    assert await profiler.files() == []
+
+    (tmp_path / "profiles").mkdir()
+    for i, name in enumerate(["old.prof", "new.prof"]):
+        path = tmp_path / "profiles" / name
+        path.write_text("x" * (i + 1))
+        os.utime(path, (i, i))
+    assert await profiler.files() == [{"name": "new.prof", "size": 2}, {"name": "old.prof", "size": 1}]
@@ -0,0 +1,109 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.core import scheduler
+from app.core.querybudget import BUDGETS
+from app.modules.chat import archive
+from app.modules.chat import service as chat_service
+from app.modules.chat.models import Message
+from app.modules.gemini import tools
+from app.modules.habit import service as habit_service
+from app.modules.journal import service as journal_service
+from app.modules.plan import service as plan_service
+from app.modules.review import service as review_service
+from app.modules.user import service as user_service
+
+TODAY = date.today()
+YESTERDAY = TODAY - timedelta(days=1)
+TOMORROW = TODAY + timedelta(days=1)
+OLD = datetime.utcnow() - timedelta(days=200)
+
+
+async def seed(db):
+    """A user with a few days of history, some of it archived: the slow paths of every function."""
+    for day in (TODAY - timedelta(days=2), YESTERDAY, TODAY):
+        await habit_service.upsert_habit_entries(db, day, {"exercise": {"completed": True}, "sleep": {"duration": 7}})
+    await journal_service.upsert_daily_journal(db, TODAY, "Good day.", {"wins": [], "improvements": []})
+    await plan_service.upsert_plan(db, YESTERDAY, ["gym", "report"])
+    await plan_service.upsert_plan(db, TOMORROW, ["gym"])
+    db.add_all([Message(user_id=1, role="user", content=f"old {i}", created_at=OLD) for i in range(5)])
+    await db.commit()
+    await archive.archive_batch(db, datetime.utcnow() - timedelta(days=90), 3)
+    db.add_all([Message(user_id=1, role="user", content="older", created_at=OLD - timedelta(days=1))])
+    await db.commit()
+    await chat_service.save_message(db, "user", "hi")
+
+
+async def tool(t, payload):
+    output = await t.ainvoke(payload)
+    assert not output.startswith("Error"), output
+    return output
+
+
+def _name(func):
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+# Budgeted function -> the call to measure (built after seeding) and the
+# arguments its callable budgets take.
+CASES = {
+    _name(journal_service.upsert_daily_journal): lambda db: journal_service.upsert_daily_journal(
+        db, TODAY, "Edited.", {"wins": ["x"], "improvements": []}),
+    _name(journal_service.get_today_journal): lambda db: journal_service.get_today_journal(db),
+    _name(habit_service.get_habit_id): lambda db: habit_service.get_habit_id(db, "reading"),
+    _name(habit_service.upsert_habit_entry): lambda db: habit_service.upsert_habit_entry(
+        db, 1, TODAY, {"completed": True, "minutes": 20}),
+    _name(habit_service.upsert_habit_entries): lambda db: habit_service.upsert_habit_entries(
+        db, TODAY, {"exercise": {"completed": False}, "water": {"glasses": 6}}),
+    _name(habit_service.get_today_habits): lambda db: habit_service.get_today_habits(db),
+    _name(habit_service.get_habits): lambda db: habit_service.get_habits(db),
+    _name(habit_service.get_streaks): lambda db: habit_service.get_streaks(db, TODAY, 90),
+    _name(habit_service.aggregate_metric): lambda db: habit_service.aggregate_metric(db, "sleep", "duration"),
+    _name(habit_service.dates_with_metric): lambda db: habit_service.dates_with_metric(
+        db, "sleep", "duration", min_value=6),
+    _name(plan_service.upsert_plan): lambda db: plan_service.upsert_plan(db, TOMORROW, ["gym", "read"]),
+    _name(plan_service.get_plan): lambda db: plan_service.get_plan(db, YESTERDAY),
+    _name(plan_service.get_yesterday_plan): lambda db: plan_service.get_yesterday_plan(db),
+    _name(chat_service.ChatService.get_messages): lambda db: chat_service.ChatService(db).get_messages(0, 10),
+    _name(chat_service.ChatService.get_history_version): lambda db: chat_service.ChatService(db).get_history_version(),
+    _name(chat_service.save_message): lambda db: chat_service.save_message(db, "assistant", "hello"),
+    _name(chat_service.get_last_messages): lambda db: chat_service.get_last_messages(db, limit=20),
+    _name(chat_service.get_message_digests): lambda db: chat_service.get_message_digests(db, OLD.date(), TODAY),
+    _name(archive.archive_batch): lambda db: archive.archive_batch(db, datetime.utcnow() - timedelta(days=90), 500),
+    _name(archive.archived_count): lambda db: archive.archived_count(db, 1),
+    _name(archive.archived_page): lambda db: archive.archived_page(db, 1, 1, 10),
+    _name(review_service.build_snapshot): lambda db: review_service.build_snapshot(db, TODAY),
+    _name(review_service.get_snapshot): lambda db: review_service.get_snapshot(db, TODAY),
+    _name(review_service.refresh_snapshot): lambda db: review_service.refresh_snapshot(db, TODAY),
+    _name(review_service.get_today_snapshot): lambda db: review_service.get_today_snapshot(db),
+    _name(review_service.precompute_snapshots): lambda db: review_service.precompute_snapshots(db, TODAY, [1, 2]),
+    _name(user_service.ensure_user): lambda db: user_service.ensure_user(db),
+    _name(user_service.get_user_ids): lambda db: user_service.get_user_ids(db),
+    _name(scheduler.acquire_lease): lambda db: scheduler.acquire_lease(db, "job", "me", datetime.now(), 60),
+    _name(scheduler.release_lease): lambda db: scheduler.release_lease(db, "job", "me", datetime.now()),
+    "app.modules.gemini.tools.save_habits": lambda db: tool(
+        tools.save_habits, {"habits": {"exercise": True, "reading": {"pages": 12}}}),
+    "app.modules.gemini.tools.save_journal": lambda db: tool(
+        tools.save_journal, {"entry": {"text": "Fine.", "wins": ["run"]}}),
+    "app.modules.gemini.tools.get_context": lambda db: tool(tools.get_context, {"_": ""}),
+    "app.modules.gemini.tools.save_tomorrow_plan": lambda db: tool(
+        tools.save_tomorrow_plan, {"data": {"tasks": ["gym"]}}),
+    "app.modules.gemini.tools.get_habits": lambda db: tool(tools.get_habits, {"_": ""}),
+}
+
+BUDGET_ARGS = {
+    _name(review_service.precompute_snapshots): {"user_ids": [1, 2]},
+}
+
+
+def test_every_budget_has_a_case():
+    assert set(BUDGETS) == set(CASES)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("name", sorted(CASES))
+async def test_within_budget(db, within_budget, name):
+    await seed(db)
+    user_service._known.clear()
+    await within_budget(name, CASES[name](db), **BUDGET_ARGS.get(name, {}))
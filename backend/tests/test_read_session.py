@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+from app.core import db as db_module
+from app.core.cache import HABITS, VersionTracker
+from app.core.config import settings
+from app.core.users import current_user_var
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """Reads routed as if DATABASE_READ_URL were set, with a fresh write tracker."""
+    monkeypatch.setattr(db_module, "replica_engine", db_module.read_engine)
+    tracker = VersionTracker()
+    monkeypatch.setattr(db_module, "versions", tracker)
+    token = current_user_var.set(5)
+    yield tracker
+    current_user_var.reset(token)
+
+
+def test_read_after_write_goes_to_the_primary(replica):
+    assert db_module.read_session().bind is db_module.read_engine
+
+    replica.bump(HABITS)
+    assert db_module.read_session().bind is db_module.async_engine
+    # Other users' writes leave this one's reads on the replica
+    replica.bump(HABITS, user_id=6)
+    token = current_user_var.set(7)
+    try:
+        assert db_module.read_session().bind is db_module.read_engine
+    finally:
+        current_user_var.reset(token)
+
+
+def test_reads_return_to_the_replica_after_the_sticky_window(replica, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_READ_STICKY_SECONDS", 0.05)
+    replica.bump(HABITS)
+    assert db_module.read_session().bind is db_module.async_engine
+
+    time.sleep(0.06)
+    assert db_module.read_session().bind is db_module.read_engine
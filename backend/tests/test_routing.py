@@ -0,0 +1,43 @@
+import pytest
+
+from app.modules.gemini.routing import FAST, PRO, Route, TurnRouter, classify_turn
+from app.modules.gemini.service import GeminiService
+
+HABITS = ["exercise", "sleep", "reading", "water"]
+
+
+@pytest.mark.parametrize("message, route", [
+    ("thanks!", Route(FAST, "acknowledgement")),
+    ("exercise done, reading 20 pages", Route(FAST, "logging")),
+    ("skipped water today", Route(FAST, "logging")),
+    ("I feel terrible, my mom is sick and I could not sleep", Route(PRO, "unclassified")),
+    ("I missed my mom", Route(PRO, "unclassified")),
+    ("exercised with 3 friends", Route(PRO, "unclassified")),
+    ("Tell me about stoicism", Route(PRO, "unclassified")),
+    ("what should I focus on", Route(PRO, "needs_context")),
+    ("is 7h of sleep enough?", Route(PRO, "question")),
+    ("exercise done " * 20, Route(PRO, "long_message")),
+])
+def test_classify_turn(message, route):
+    assert classify_turn(message, HABITS) == route
+
+
+def test_override_pins_the_tier():
+    router = TurnRouter({FAST: "flash", PRO: "pro"}, override="fast")
+    assert router.route("Tell me about stoicism") == Route(FAST, "override")
+    # A per-call override wins over the global one; unknown tiers are ignored
+    assert router.route("thanks", override="pro") == Route(PRO, "override")
+    assert TurnRouter({FAST: "flash", PRO: "pro"}, override="cheap").route("thanks") == Route(FAST, "acknowledgement")
+
+
+@pytest.mark.anyio
+async def test_service_routes_turns_to_stub_models(stub_llm):
+    factory, built = stub_llm([{"text": "Noted.", "tool_calls": []}], speed=0)
+    service = GeminiService(llm_factory=factory)
+
+    assert await service.generate_content("thanks") == "Noted."
+    assert built == [service.router.models[FAST]]
+    await service.generate_content("Tell me about stoicism")
+    assert built[-1] == service.router.models[PRO]
+    await service.generate_content("Tell me about stoicism", tier=FAST)
+    assert len(built) == 2  # both models built once and reused
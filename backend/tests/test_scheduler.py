@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime, time
+
+import pytest
+
+from app.core.db import async_session
+from app.core.querybudget import count_queries
+from app.core.scheduler import BackgroundLoop, Job, Scheduler
+
+
+@pytest.mark.anyio
+async def test_background_loop_survives_failures_until_stopped():
+    calls = []
+
+    async def run():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise RuntimeError("first pass fails")
+
+    loop = BackgroundLoop("Test job", run, lambda: 0.001)
+    loop.start()
+    loop.start()  # already running: no second task
+    while len(calls) < 3:
+        await asyncio.sleep(0.001)
+    await loop.stop()
+
+    count = len(calls)
+    await asyncio.sleep(0.01)
+    assert len(calls) == count
+
+
+@pytest.mark.anyio
+async def test_slot_done_elsewhere_is_not_retried(db):
+    runs = []
+
+    async def run():
+        runs.append(1)
+
+    a, b = Scheduler(async_session), Scheduler(async_session)
+    for worker, owner in ((a, "a"), (b, "b")):
+        worker.owner = owner
+        worker.add(Job("digest", run, at=time(3, 0)))
+    now = datetime(2026, 1, 2, 4, 0)
+
+    assert await a.run_due(now) == ["digest"]
+    with count_queries() as counter:
+        assert await b.run_due(now) == []
+        assert await b.run_due(now) == []
+    assert runs == [1]
+    # Recorded as done on the first look: one UPDATE and one SELECT, no failing INSERT
+    assert b._done["digest"] == datetime(2026, 1, 2, 3, 0)
+    assert counter.statements == 2 and counter.commits == 0
@@ -0,0 +1,33 @@
+import pytest
+
+from app.core.cache import versions
+from app.modules.gemini.cache import ToolCache
+
+
+def counting_tool(cache):
+    calls = []
+
+    @cache.reads("habits")
+    async def get_habits():
+        calls.append(1)
+        return f"habits {len(calls)}"
+
+    return get_habits, calls
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("shared", [False, True])
+async def test_entries_cross_turns_only_with_a_shared_feed(monkeypatch, shared):
+    monkeypatch.setattr(versions, "shared", shared)
+    cache = ToolCache()
+    get_habits, calls = counting_tool(cache)
+
+    with cache.turn():
+        await get_habits()
+        await get_habits()
+    assert len(calls) == 1
+
+    with cache.turn():
+        await get_habits()
+    # Without a shared feed, another worker may have written in between
+    assert len(calls) == (1 if shared else 2)
@@ -0,0 +1,72 @@
+import asyncio
+import gc
+
+import pytest
+
+from app.core.cache import VersionTracker
+from app.core.config import settings
+from app.core.users import current_user_var
+from app.modules.gemini.cache import ToolCache
+from app.modules.user import service as user_service
+
+
+@pytest.mark.anyio
+async def test_write_locks_serialize_and_are_dropped_when_idle():
+    cache = ToolCache()
+    order = []
+
+    @cache.writes("habits")
+    async def write(name):
+        order.append(f"{name} start")
+        await asyncio.sleep(0.01)
+        order.append(f"{name} end")
+
+    token = current_user_var.set(7)
+    try:
+        await asyncio.gather(write("a"), write("b"))
+    finally:
+        current_user_var.reset(token)
+
+    assert order == ["a start", "a end", "b start", "b end"]
+    gc.collect()
+    assert len(cache._locks) == 0
+
+
+@pytest.mark.anyio
+async def test_known_users_are_bounded(db, monkeypatch):
+    monkeypatch.setattr(user_service, "KNOWN_USERS_MAX", 2)
+    user_service._known.clear()
+    for user_id in (1, 2, 3):
+        token = current_user_var.set(user_id)
+        try:
+            await user_service.ensure_user(db)
+        finally:
+            current_user_var.reset(token)
+
+    assert list(user_service._known) == [2, 3]
+
+
+def test_user_header_ignored_unless_trusted(client, monkeypatch):
+    client.post("/api/v1/chat/", params={"message": "journal: mine"}, headers={"X-User-Id": "2"})
+    # Untrusted: the header is ignored, so that went to the default user
+    assert "mine" in client.get("/api/v1/chat/").text
+
+    monkeypatch.setattr(settings, "TRUST_USER_HEADER", True)
+    assert "mine" not in client.get("/api/v1/chat/", headers={"X-User-Id": "2"}).text
+    client.post("/api/v1/chat/", params={"message": "journal: theirs"}, headers={"X-User-Id": "2"})
+    assert "theirs" in client.get("/api/v1/chat/", headers={"X-User-Id": "2"}).text
+    assert "theirs" not in client.get("/api/v1/chat/").text
+
+
+def test_version_tracker_is_bounded_and_never_goes_back():
+    tracker = VersionTracker(maxsize=2)
+    for _ in range(3):
+        tracker.bump("habits", user_id=1)
+    etag = tracker.etag(["habits"], user_id=1)
+    tracker.bump("habits", user_id=2)
+    tracker.bump("habits", user_id=3)
+
+    assert len(tracker._versions) == 2
+    assert tracker.version("habits", 1) >= 3
+    tracker.bump("habits", user_id=1)
+    assert tracker.etag(["habits"], user_id=1) != etag